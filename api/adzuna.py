@@ -1,13 +1,27 @@
+import logging
+from datetime import datetime
 from models.job import Job
 from models.job_client import JobClient
-import requests
-from typing import List
+from models.watermark import Watermark, format_posted_at
+import httpx
+from typing import AsyncIterator, List
+
+log = logging.getLogger(__name__)
 
 
 class AdzunaClient(JobClient):
     BASE_URL = "https://api.adzuna.com/v1/api"
 
-    def __init__(self, app_id, app_key, country="us"):
+    def __init__(
+        self,
+        app_id,
+        app_key,
+        session: httpx.AsyncClient,
+        country="us",
+        base_url: str = BASE_URL,
+    ):
+        super().__init__(session)
+        self.base_url = base_url.rstrip("/")
         self.app_id = app_id
         self.app_key = app_key
         self.country = country
@@ -47,61 +61,84 @@ class AdzunaClient(JobClient):
                 return code
         return None  # Return None if no supported country is found
 
-    def get_jobs(
-        self, what: str, where: str, remote_only: bool = False, max_pages: int = 5
-    ) -> List[Job]:
-        all_found_jobs = []
+    @staticmethod
+    def _posted_at(created: str | None) -> str | None:
+        """Adzuna's `created` is ISO 8601, e.g. '2025-09-08T10:12:33Z'."""
+        if not created:
+            return None
+        try:
+            return format_posted_at(
+                datetime.fromisoformat(created.replace("Z", "+00:00"))
+            )
+        except ValueError:
+            return None
 
+    async def iter_pages(
+        self,
+        what: str,
+        where: str,
+        remote_only: bool = False,
+        since: Watermark | None = None,
+        max_pages: int = 5,
+        page_window: int = 5,
+    ) -> AsyncIterator[List[Job]]:
         country_code = self._get_country_code(where)
         if not country_code:
-            print(
+            log.warning(
                 f"Adzuna search skipped: Location '{where}' is not a supported country."
             )
-            return (
-                all_found_jobs  # Return an empty list if the country is not supported
-            )
-
-        print(f"Adzuna client targeting country: '{country_code}'")
+            return  # Yield nothing if the country is not supported
 
-        current_page = 1
-        while current_page <= max_pages:
-            print(f"Fetching page {current_page} from Adzuna...")
+        log.info(f"Adzuna client targeting country: '{country_code}'")
 
-            search_what = f"{what} remote" if remote_only else what
-            params = {
-                "app_id": self.app_id,
-                "app_key": self.app_key,
-                "what": search_what,
-                "results_per_page": self.MAX_RESULTS_PER_PAGE,
-            }
-            if not remote_only:
-                params["where"] = where
+        search_what = f"{what} remote" if remote_only else what
+        params = {
+            "app_id": self.app_id,
+            "app_key": self.app_key,
+            "what": search_what,
+            "results_per_page": self.MAX_RESULTS_PER_PAGE,
+        }
+        if not remote_only:
+            params["where"] = where
+        if since is not None:
+            # Incremental: newest first and no older than the last run's
+            # newest posting, one page at a time so the search stops at the
+            # first page that reaches the jobs earlier runs returned
+            params["sort_by"] = "date"
+            max_days_old = since.max_days_old()
+            if max_days_old:
+                params["max_days_old"] = max_days_old
+            page_window = 1
 
+        async def fetch_page(page: int) -> List[Job]:
+            log.debug(f"Fetching page {page} from Adzuna...")
             try:
-                # Use the page number in the URL path, as we fixed before
-                url = f"{self.BASE_URL}/jobs/{country_code}/search/{current_page}"
-                response = requests.get(url, params=params)
+                # Adzuna takes the page number in the URL path
+                url = f"{self.base_url}/jobs/{country_code}/search/{page}"
+                response = await self.session.get(url, params=params)
                 response.raise_for_status()
                 jobs_data = response.json().get("results", [])
+            except httpx.HTTPError as e:
+                log.error(f"An error occurred with Adzuna: {e}")
+                raise
 
-                if not jobs_data:
-                    print("Adzuna returned no more results. Stopping pagination.")
-                    break
-
-                for job in jobs_data:
-                    all_found_jobs.append(
-                        Job(
-                            title=job.get("title"),
-                            company_name=job.get("company", {}).get("display_name"),
-                            location=job.get("location", {}).get("display_name"),
-                            url=job.get("redirect_url"),
-                        )
-                    )
-
-                current_page += 1
+            if not jobs_data:
+                log.debug("Adzuna returned no more results. Stopping pagination.")
 
-            except requests.exceptions.RequestException as e:
-                print(f"An error occurred with Adzuna: {e}")
-                break
+            jobs = [
+                Job(
+                    title=job.get("title"),
+                    company_name=job.get("company", {}).get("display_name"),
+                    location=job.get("location", {}).get("display_name"),
+                    url=job.get("redirect_url"),
+                    posted_at=self._posted_at(job.get("created")),
+                    source_id=str(job["id"]) if job.get("id") is not None else None,
+                )
+                for job in jobs_data
+            ]
+            return jobs
 
-        return all_found_jobs
+        async for jobs in self._iter_paginated(
+            fetch_page, max_pages, page_window, since=since
+        ):
+            yield jobs
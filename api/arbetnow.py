@@ -1,34 +1,75 @@
+import logging
+from datetime import datetime, timezone
 from models.job_client import JobClient
 from models.job import Job
-import requests
+from models.watermark import Watermark, format_posted_at
+import httpx
+from typing import AsyncIterator
+
+log = logging.getLogger(__name__)
 
 
 class ArbeitnowClient(JobClient):
     BASE_URL = "https://www.arbeitnow.com/api"
 
-    def get_jobs(self, what, where, page=1, remote_only: bool = False) -> list[Job]:
+    def __init__(self, session: httpx.AsyncClient, base_url: str = BASE_URL):
+        super().__init__(session)
+        self.base_url = base_url.rstrip("/")
+
+    @staticmethod
+    def _posted_at(created_at: int | None) -> str | None:
+        """Arbeitnow's `created_at` is a Unix timestamp."""
+        if not isinstance(created_at, (int, float)):
+            return None
+        return format_posted_at(datetime.fromtimestamp(created_at, timezone.utc))
+
+    async def iter_pages(
+        self,
+        what,
+        where,
+        remote_only: bool = False,
+        since: Watermark | None = None,
+        max_pages: int = 5,
+        page_window: int = 5,
+    ) -> AsyncIterator[list[Job]]:
         params = {
             "search": what,
             "location": where,
-            "page": page,
         }
 
         if remote_only:
             params["remote"] = "true"
+        # The board lists the newest jobs first, so with a watermark one page
+        # at a time is enough to stop at the first page that reaches the
+        # jobs earlier runs returned
+        if since is not None:
+            page_window = 1
 
-        try:
-            response = requests.get(f"{self.BASE_URL}/job-board-api", params=params)
-            response.raise_for_status()
-            jobs_data = response.json().get("data", [])
-            return [
+        async def fetch_page(page: int) -> list[Job]:
+            try:
+                response = await self.session.get(
+                    f"{self.base_url}/job-board-api", params={**params, "page": page}
+                )
+                response.raise_for_status()
+                jobs_data = response.json().get("data", [])
+            except httpx.HTTPError as e:
+                log.error(f"An error occurred with Arbeitnow: {e}")
+                raise
+
+            jobs = [
                 Job(
                     title=job.get("title"),
                     company_name=job.get("company_name"),
                     location=job.get("location"),
                     url=job.get("url"),
+                    posted_at=self._posted_at(job.get("created_at")),
+                    source_id=job.get("slug"),
                 )
                 for job in jobs_data
             ]
-        except requests.exceptions.RequestException as e:
-            print(f"An error occurred with Arbeitnow: {e}")
-            return []
+            return jobs
+
+        async for jobs in self._iter_paginated(
+            fetch_page, max_pages, page_window, since=since
+        ):
+            yield jobs
@@ -0,0 +1,336 @@
+"""
+Offline end-to-end benchmark of the job pipeline.
+
+Starts local stand-ins for the job APIs and job sites (see servers.py) and
+runs the real `main.main` pipeline against them, once per repetition in a
+fresh process with its own empty working directory. Reports jobs/sec,
+per-job latency, peak memory and browser launches, and saves everything as
+JSON so results can be compared between commits:
+
+    python -m benchmarks.run --jobs 200 --concurrency 4 --repeat 3
+    python -m benchmarks.run --baseline benchmarks/results/<earlier>.json
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import glob
+import json
+import logging
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.servers import BenchmarkSite, StandInServers
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+# Metrics compared against a baseline, and whether higher is better
+COMPARED_METRICS = {
+    "jobs_per_sec": True,
+    "latency_p50_ms": False,
+    "latency_p95_ms": False,
+    "peak_rss_mb": False,
+    "browser_launches": False,
+}
+
+
+def _percentile(values: list[float], percent: int) -> float:
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+def _peak_rss_mb(who: int) -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def _run_pipeline(options: dict) -> dict:
+    """Runs `main.main` once in this process and measures it."""
+    import main
+    from services import scrape_worker
+    from services.metrics import metrics
+    from services.run_journal import RunJournal
+
+    latencies: list[float] = []
+    scrapers = []
+    process_job = main.process_job
+
+    async def timed_process_job(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await process_job(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    class TrackedScraperService(scrape_worker.ScraperService):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            scrapers.append(self)
+
+    main.process_job = timed_process_job
+    scrape_worker.ScraperService = TrackedScraperService
+
+    started = time.perf_counter()
+    await main.main(
+        search_what="benchmark engineer",
+        search_where="Berlin, Germany",
+        remote_only=False,
+        target_lang="en",
+        concurrency=options["concurrency"],
+        use_cache=False,
+        http_first=not options["browser_only"],
+        formats=options["formats"],
+        host_rate=options["host_rate"],
+    )
+    elapsed = time.perf_counter() - started
+
+    (journal_path,) = glob.glob(os.path.join("data", "*.journal.sqlite3"))
+    run_id = os.path.basename(journal_path).removesuffix(".journal.sqlite3")
+    with RunJournal(run_id) as journal:
+        states = journal.state_counts()
+    scraper = scrapers[0]
+    return {
+        "jobs": len(latencies),
+        "saved": states["saved"],
+        "filtered": states["filtered"],
+        "blocked": states["blocked"],
+        "elapsed_s": round(elapsed, 3),
+        "jobs_per_sec": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        "latency_p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+        "latency_p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+        "peak_rss_mb": round(_peak_rss_mb(resource.RUSAGE_SELF), 1),
+        "peak_child_rss_mb": round(_peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+        "browser_launches": scraper.browser_pool.launch_count,
+        "proxies": len(scraper.proxy_manager.proxies) if scraper.proxy_manager else 0,
+        "http_scrapes": scraper.stats["http_scrapes"],
+        "browser_scrapes": scraper.stats["browser_scrapes"],
+        "stages": metrics.to_dict()["histograms"],
+    }
+
+
+def run_once(servers: StandInServers, options: dict, verbose: bool) -> dict:
+    """Runs the pipeline in a child process, in a fresh working directory."""
+    with tempfile.TemporaryDirectory(prefix="hunter-bench-") as workdir:
+        result_file = os.path.join(workdir, "result.json")
+        env = {
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join(
+                filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")])
+            ),
+            "ADZUNA_APP_ID": "benchmark",
+            "ADZUNA_APP_KEY": "benchmark",
+            "ADZUNA_API_URL": servers.adzuna_url,
+            "ARBEITNOW_API_URL": servers.arbeitnow_url,
+            # Without stand-in proxies, scrape from the local IP
+            "WEBSHARE_API_KEY": "benchmark" if servers.site.proxies else "",
+            "WEBSHARE_API_URL": servers.webshare_url,
+        }
+        command = [
+            sys.executable,
+            "-m",
+            "benchmarks.run",
+            "--child",
+            json.dumps(options),
+            "--result-file",
+            result_file,
+        ]
+        subprocess.run(
+            command,
+            cwd=workdir,
+            env=env,
+            check=True,
+            stdout=None if verbose else subprocess.DEVNULL,
+            stderr=None if verbose else subprocess.DEVNULL,
+        )
+        with open(result_file) as f:
+            return json.load(f)
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _summarize(runs: list[dict]) -> dict:
+    """Median of each numeric metric across the runs."""
+    return {
+        key: round(statistics.median(run[key] for run in runs), 3)
+        for key, value in runs[0].items()
+        if isinstance(value, (int, float))
+    }
+
+
+def _compare(summary: dict, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('commit')}):")
+    for metric, higher_is_better in COMPARED_METRICS.items():
+        old = baseline["summary"].get(metric)
+        new = summary.get(metric)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        better = change > 0 if higher_is_better else change < 0
+        verdict = "better" if better else "worse" if change else "same"
+        print(f"  {metric}: {old} -> {new} ({change:+.1f}%, {verdict})")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Offline end-to-end benchmark of the job pipeline"
+    )
+    site_defaults = BenchmarkSite()
+    parser.add_argument("--jobs", type=int, default=site_defaults.jobs)
+    parser.add_argument(
+        "--sites",
+        type=int,
+        default=site_defaults.sites,
+        help="Number of job-site hosts the job pages are spread over.",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=site_defaults.page_size,
+        help="Characters of description text per job page.",
+    )
+    parser.add_argument(
+        "--page-latency",
+        type=float,
+        default=site_defaults.page_latency,
+        help="Seconds each job page takes to respond.",
+    )
+    parser.add_argument(
+        "--api-latency",
+        type=float,
+        default=site_defaults.api_latency,
+        help="Seconds each API page takes to respond.",
+    )
+    parser.add_argument(
+        "--js-fraction",
+        type=float,
+        default=site_defaults.js_fraction,
+        help="Share of job pages that only render with JavaScript (needs a browser).",
+    )
+    parser.add_argument(
+        "--block-fraction",
+        type=float,
+        default=site_defaults.block_fraction,
+        help="Share of job pages that always return a block page.",
+    )
+    parser.add_argument(
+        "--email-fraction",
+        type=float,
+        default=site_defaults.email_fraction,
+        help="Share of job pages that contain a contact email.",
+    )
+    parser.add_argument(
+        "--proxies",
+        type=int,
+        default=site_defaults.proxies,
+        help="Proxies the Webshare stand-in lists; scrapes go through them.",
+    )
+    parser.add_argument("--seed", type=int, default=site_defaults.seed)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--host-rate", type=float, default=0.5)
+    parser.add_argument("--browser-only", action="store_true")
+    parser.add_argument("--format", nargs="+", default=["csv", "jsonl"])
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument(
+        "--output",
+        help="Where to save the results. Default: benchmarks/results/<time>_<commit>.json",
+    )
+    parser.add_argument("--baseline", help="Earlier results file to compare with.")
+    parser.add_argument(
+        "--verbose", action="store_true", help="Show the pipeline's own output."
+    )
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        logging.basicConfig(
+            level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+        )
+        result = asyncio.run(_run_pipeline(json.loads(args.child)))
+        with open(args.result_file, "w") as f:
+            json.dump(result, f)
+        return
+
+    site = BenchmarkSite(
+        jobs=args.jobs,
+        sites=args.sites,
+        page_size=args.page_size,
+        page_latency=args.page_latency,
+        api_latency=args.api_latency,
+        js_fraction=args.js_fraction,
+        block_fraction=args.block_fraction,
+        email_fraction=args.email_fraction,
+        proxies=args.proxies,
+        seed=args.seed,
+    )
+    options = {
+        "concurrency": args.concurrency,
+        "host_rate": args.host_rate,
+        "browser_only": args.browser_only,
+        "formats": args.format,
+    }
+
+    runs = []
+    with StandInServers(site) as servers:
+        for repetition in range(args.repeat):
+            result = run_once(servers, options, args.verbose)
+            runs.append(result)
+            print(
+                f"Run {repetition + 1}/{args.repeat}: {result['jobs']} jobs in "
+                f"{result['elapsed_s']:.1f}s ({result['jobs_per_sec']:.2f} jobs/s), "
+                f"p50 {result['latency_p50_ms']:.0f} ms, "
+                f"p95 {result['latency_p95_ms']:.0f} ms, "
+                f"peak RSS {result['peak_rss_mb']:.0f} MB, "
+                f"{result['browser_launches']} browser launches"
+            )
+
+    summary = _summarize(runs)
+    report = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "site": dataclasses.asdict(site),
+        "options": options,
+        "runs": runs,
+        "summary": summary,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR,
+        f"{datetime.now():%Y%m%d_%H%M%S}_{report['commit'] or 'nocommit'}.json",
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {output}")
+
+    if args.baseline:
+        _compare(summary, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
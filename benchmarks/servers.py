@@ -0,0 +1,341 @@
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+ADZUNA_PAGE_SIZE = 50  # AdzunaClient.MAX_RESULTS_PER_PAGE
+ARBEITNOW_PAGE_SIZE = 100  # Fixed by the real Arbeitnow API
+MAX_API_PAGES = 5  # Both clients stop after this many pages
+# Smaller than the page size ProxyManager asks for, so a few proxies
+# already span several pages of the Webshare stand-in's list
+WEBSHARE_MAX_PAGE_SIZE = 10
+WEBSHARE_PATH = "/api/v2/proxy/list/"
+
+ADZUNA_PATH = re.compile(r"^/v1/api/jobs/(?P<country>\w+)/search/(?P<page>\d+)$")
+JOB_PATH = re.compile(r"^/jobs/(?P<index>\d+)$")
+
+SENTENCES = [
+    "You will design, build and operate services used by millions of customers every day.",
+    "Our team values clear communication, thoughtful code review and shipping small changes often.",
+    "You have several years of experience building reliable backend systems in production.",
+    "Experience with cloud infrastructure, containers and continuous delivery is a strong plus.",
+    "We offer flexible working hours, a generous learning budget and thirty days of paid leave.",
+    "The role reports to the engineering manager and works closely with product and design.",
+    "You care about automated testing, observability and keeping systems simple to operate.",
+    "We are an equal opportunity employer and welcome applications from all backgrounds.",
+    "Together with a small cross-functional team you will own features from idea to release.",
+    "Knowledge of relational databases, caching and message queues will help you succeed here.",
+    "You enjoy mentoring colleagues and sharing what you learn in talks or written guides.",
+    "Our office is close to the central station and we also support fully remote work.",
+    "The interview process has three short stages and we reply to every application.",
+    "You will help us improve performance, reliability and the developer experience of our platform.",
+    "Strong written English is required because most of our communication is asynchronous.",
+    "We use modern tooling and give every engineer the hardware and software they need.",
+]
+NAVIGATION = ["Home", "Jobs", "Companies", "Salaries", "Sign in", "Post a job"]
+FOOTER = ["About us", "Privacy", "Terms", "Contact", "Cookie settings"]
+
+BLOCK_PAGE = (
+    "<html><head><title>Access Denied</title></head><body>"
+    "<h1>Access Denied</h1><p>We detected suspicious behaviour from your network.</p>"
+    "</body></html>"
+)
+
+
+@dataclass
+class BenchmarkSite:
+    """What the stand-in servers serve, and how job pages behave."""
+
+    jobs: int = 100
+    sites: int = 20  # Job pages are spread over this many hosts
+    page_size: int = 6000  # Characters of description text per page
+    page_latency: float = 0.05  # Seconds before a job page responds
+    api_latency: float = 0.1  # Seconds before an API page responds
+    js_fraction: float = 0.0  # Pages that only render with JavaScript
+    block_fraction: float = 0.05  # Pages that always return a block page
+    email_fraction: float = 0.3  # Pages that contain a contact email
+    proxies: int = 0  # Proxies the Webshare stand-in lists
+    seed: int = 0
+
+    @property
+    def adzuna_jobs(self) -> int:
+        return self.jobs - self.jobs // 2
+
+    @property
+    def arbeitnow_jobs(self) -> int:
+        return self.jobs // 2
+
+    def validate(self):
+        if self.adzuna_jobs > ADZUNA_PAGE_SIZE * MAX_API_PAGES:
+            raise ValueError(
+                f"At most {2 * ADZUNA_PAGE_SIZE * MAX_API_PAGES} jobs are supported "
+                "(the API clients stop after five pages)."
+            )
+        if self.js_fraction + self.block_fraction > 1:
+            raise ValueError("js_fraction + block_fraction must not exceed 1.")
+
+    def page_kind(self, index: int) -> str:
+        """'block', 'js' or 'static'; fixed per job so runs are comparable."""
+        roll = random.Random(self.seed * 1_000_003 + index).random()
+        if roll < self.block_fraction:
+            return "block"
+        if roll < self.block_fraction + self.js_fraction:
+            return "js"
+        return "static"
+
+    def description(self, index: int) -> tuple[str, str | None]:
+        """Returns a job's description paragraphs and contact email (if any)."""
+        rng = random.Random(self.seed * 1_000_003 + index + 1)
+        paragraphs = []
+        length = 0
+        while length < self.page_size:
+            paragraph = " ".join(rng.sample(SENTENCES, 4))
+            paragraphs.append(paragraph)
+            length += len(paragraph)
+        email = None
+        if rng.random() < self.email_fraction:
+            email = f"jobs{index}@company{index % 50}.jobs"
+            paragraphs.append(
+                f"Send your application to {email} before the end of the month."
+            )
+        return "\n".join(f"<p>{escape(p)}</p>" for p in paragraphs), email
+
+    def job_page(self, index: int) -> str:
+        kind = self.page_kind(index)
+        if kind == "block":
+            return BLOCK_PAGE
+
+        body, _ = self.description(index)
+        navigation = "".join(f"<li><a href='/'>{item}</a></li>" for item in NAVIGATION)
+        footer = "".join(f"<li><a href='/'>{item}</a></li>" for item in FOOTER)
+        head = (
+            f"<head><title>Benchmark Engineer {index}</title>"
+            "<link rel='stylesheet' href='/static/site.css'>"
+            "<script src='https://www.googletagmanager.com/gtag/js'></script></head>"
+        )
+        if kind == "js":
+            # The description only exists once the script has run
+            return (
+                f"<html>{head}<body><nav><ul>{navigation}</ul></nav>"
+                "<div id='app'>Loading...</div>"
+                "<noscript>You need to enable JavaScript to run this app.</noscript>"
+                f"<script>document.getElementById('app').innerHTML = {json.dumps(body)};"
+                "</script></body></html>"
+            )
+        return (
+            f"<html>{head}<body><nav><ul>{navigation}</ul></nav>"
+            f"<main><h1>Benchmark Engineer {index}</h1>"
+            f"<img src='/static/logo.png'>{body}</main>"
+            f"<footer><ul>{footer}</ul></footer></body></html>"
+        )
+
+    def proxy_list(self, job_hosts: list[str]) -> list[dict]:
+        """
+        The Webshare proxy list: `proxies` working proxies (the job-site
+        servers, which also answer proxy requests), plus one entry marked
+        invalid and one malformed entry that the proxy manager must skip.
+        """
+        if not self.proxies:
+            return []
+        entries = []
+        for number in range(self.proxies):
+            address, port = job_hosts[number % len(job_hosts)].split(":")
+            entries.append(
+                {
+                    "proxy_address": address,
+                    "port": int(port),
+                    "username": f"user{number}",
+                    "password": "benchmark",
+                    "country_code": "DE",
+                    "city_name": "Berlin",
+                    "valid": True,
+                }
+            )
+        entries.append({**entries[0], "username": "expired", "valid": False})
+        entries.append({"proxy_address": "127.0.0.1", "valid": True})
+        return entries
+
+    def job(self, index: int, job_host: str) -> dict:
+        return {
+            "title": f"Benchmark Engineer {index}",
+            "company": f"Company {index % 50}",
+            "location": "Berlin",
+            "url": f"http://{job_host}/jobs/{index}",
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_StandInServer"
+
+    def log_message(self, format, *args):
+        pass  # Keep the benchmark output readable
+
+    def _send(self, status: int, body: str, content_type: str):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        site = self.server.site
+        route = self.server.route
+
+        if route == "api":
+            time.sleep(site.api_latency)
+            adzuna = ADZUNA_PATH.match(parts.path)
+            if adzuna:
+                page = int(adzuna["page"])
+                per_page = int(query.get("results_per_page", [ADZUNA_PAGE_SIZE])[0])
+                indexes = range(
+                    (page - 1) * per_page, min(page * per_page, site.adzuna_jobs)
+                )
+                results = []
+                for index in indexes:
+                    job = site.job(index, self.server.job_host(index))
+                    results.append(
+                        {
+                            "title": job["title"],
+                            "company": {"display_name": job["company"]},
+                            "location": {"display_name": job["location"]},
+                            "redirect_url": job["url"],
+                        }
+                    )
+                payload = {"count": site.adzuna_jobs, "results": results}
+                return self._send(200, json.dumps(payload), "application/json")
+            if parts.path == "/api/job-board-api":
+                page = int(query.get("page", ["1"])[0])
+                start = site.adzuna_jobs + (page - 1) * ARBEITNOW_PAGE_SIZE
+                stop = min(start + ARBEITNOW_PAGE_SIZE, site.jobs)
+                data = []
+                for index in range(start, stop):
+                    job = site.job(index, self.server.job_host(index))
+                    data.append(
+                        {
+                            "title": job["title"],
+                            "company_name": job["company"],
+                            "location": job["location"],
+                            "url": job["url"],
+                        }
+                    )
+                return self._send(200, json.dumps({"data": data}), "application/json")
+            if parts.path == WEBSHARE_PATH:
+                if not self.headers.get("Authorization", "").startswith("Token "):
+                    return self._send(401, "unauthorized", "text/plain")
+                page = int(query.get("page", ["1"])[0])
+                page_size = min(
+                    int(query.get("page_size", [WEBSHARE_MAX_PAGE_SIZE])[0]),
+                    WEBSHARE_MAX_PAGE_SIZE,
+                )
+                entries = self.server.proxy_list()
+                results = entries[(page - 1) * page_size : page * page_size]
+                next_url = None
+                if page * page_size < len(entries):
+                    host, port = self.server.server_address[:2]
+                    next_url = (
+                        f"http://{host}:{port}{WEBSHARE_PATH}"
+                        f"?mode=direct&page={page + 1}&page_size={page_size}"
+                    )
+                payload = {"count": len(entries), "next": next_url, "results": results}
+                return self._send(200, json.dumps(payload), "application/json")
+            return self._send(404, "not found", "text/plain")
+
+        # Job-site servers double as the proxies: a proxied request comes in
+        # with an absolute URL, which urlsplit above reduces to the path
+        job_page = JOB_PATH.match(parts.path)
+        if job_page:
+            time.sleep(site.page_latency)
+            page = site.job_page(int(job_page["index"]))
+            return self._send(200, page, "text/html; charset=utf-8")
+        return self._send(404, "not found", "text/plain")
+
+
+class _StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self, address, site: BenchmarkSite, route: str, job_host=None, proxy_list=None
+    ):
+        super().__init__(address, _Handler)
+        self.site = site
+        self.route = route
+        self.job_host = job_host
+        self.proxy_list = proxy_list
+
+
+class StandInServers:
+    """
+    Local HTTP servers standing in for the job APIs and job sites.
+
+    One server answers the Adzuna `/v1/api/jobs/{country}/search/{page}`,
+    Arbeitnow `/api/job-board-api` and paginated Webshare proxy list
+    `/api/v2/proxy/list/` endpoints. Job pages are spread over
+    `site.sites` servers on their own loopback addresses (127.0.0.2, ...),
+    so the scraper's per-host pacing sees them as different job sites. Where
+    the OS only allows 127.0.0.1, every site shares it.
+    """
+
+    def __init__(self, site: BenchmarkSite):
+        site.validate()
+        self.site = site
+        self._servers: list[_StandInServer] = []
+        self._job_hosts: list[str] = []
+
+    def job_host(self, index: int) -> str:
+        return self._job_hosts[index % len(self._job_hosts)]
+
+    @property
+    def adzuna_url(self) -> str:
+        host, port = self._servers[0].server_address[:2]
+        return f"http://{host}:{port}/v1/api"
+
+    @property
+    def arbeitnow_url(self) -> str:
+        host, port = self._servers[0].server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    @property
+    def webshare_url(self) -> str:
+        host, port = self._servers[0].server_address[:2]
+        return f"http://{host}:{port}{WEBSHARE_PATH}"
+
+    def proxy_list(self) -> list[dict]:
+        return self.site.proxy_list(self._job_hosts)
+
+    def start(self):
+        api = _StandInServer(
+            ("127.0.0.1", 0), self.site, "api", self.job_host, self.proxy_list
+        )
+        self._servers.append(api)
+        for number in range(self.site.sites):
+            try:
+                server = _StandInServer((f"127.0.0.{number + 2}", 0), self.site, "jobs")
+            except OSError:
+                server = _StandInServer(("127.0.0.1", 0), self.site, "jobs")
+            self._servers.append(server)
+            host, port = server.server_address[:2]
+            self._job_hosts.append(f"{host}:{port}")
+        for server in self._servers:
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def shutdown(self):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        self._servers.clear()
+        self._job_hosts.clear()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
@@ -1,122 +1,728 @@
 import asyncio
 import argparse
+import logging
 import os
-import random
+import signal
+import time
+from collections import Counter
+from contextlib import AsyncExitStack, ExitStack
 from dotenv import load_dotenv
 from api.adzuna import AdzunaClient
 from api.arbetnow import ArbeitnowClient
+from models.job import Job
+from models.search_query import SearchQuery, load_queries
 from services.job_search import JobSearch
+from services.dedup import JobDeduplicator
+from services.data_writer import DataWriter, make_run_id
 from services.csv_writer import CSVWriter
 from services.jsonl_writer import JSONLWriter
+from services.parquet_writer import ParquetWriter
 from services.scraper import ScraperService
-from langdetect import detect, LangDetectException
-from services.proxy_manager import ProxyManager
+from services.scrape_worker import (
+    ScraperOptions,
+    WorkerPool,
+    create_proxy_manager,
+    create_scraper_service,
+    log_scraper_summary,
+)
+from services.http_session import create_http_session
+from services.api_cache import ResponseCache
+from services.near_duplicates import NearDuplicateIndex
+from services.language_filter import LanguageFilter
+from services.metrics import metrics
+from services.watermarks import WatermarkStore
+from services.work_queue import WorkQueue
+from services.run_journal import (
+    RunJournal,
+    STATE_BLOCKED,
+    STATE_DUPLICATE,
+    STATE_FILTERED,
+    STATE_PENDING,
+    STATE_SAVED,
+    STATE_SCRAPED,
+)
+
+WRITER_CLASSES = {
+    "csv": CSVWriter,
+    "jsonl": JSONLWriter,
+    "parquet": ParquetWriter,
+}
+DEFAULT_FORMATS = ["csv", "jsonl"]
+# Seconds between looks at the work queue while no results are waiting
+COLLECT_INTERVAL = 0.05
+MAX_COLLECT_INTERVAL = 0.5
+# Seconds between checks for writer buffers due for a time-based checkpoint
+CHECKPOINT_INTERVAL = 1.0
+
+log = logging.getLogger(__name__)
 
 
 async def main(
-    search_what: str,
-    search_where: str,
+    search_what: str | None,
+    search_where: str | None,
     remote_only: bool,
     target_lang: str,
     test_limit: int = 0,
+    concurrency: int = 1,
+    cache_ttl_hours: float = 168,
+    use_cache: bool = True,
+    block_resources: bool = True,
+    allow_domains: list[str] | None = None,
+    http_first: bool = True,
+    formats: list[str] = DEFAULT_FORMATS,
+    host_rate: float = 0.5,
+    run_id: str | None = None,
+    retry_blocked: bool = False,
+    metrics_textfile: str | None = None,
+    use_storage_state: bool = True,
+    storage_state_ttl_hours: float = 24,
+    queries: list[SearchQuery] | None = None,
+    incremental: bool = False,
+    use_api_cache: bool = True,
+    api_cache_ttl_hours: float = 1,
+    offline: bool = False,
+    extract_content: bool = True,
+    max_description_chars: int = 20000,
+    near_duplicate_mode: str = "skip",
+    near_duplicate_threshold: float = 0.9,
+    worker_processes: int = 0,
 ):
     """
     Main asynchronous function to run the job search and scraping pipeline.
+
+    With `queries`, runs each of those searches in turn (a batch) instead of
+    the one given by the first four arguments. The searches share the HTTP
+    session, the scraper and its browser pool, the scrape cache and the
+    deduplicator, so a posting found by several queries is scraped and
+    saved only once, by the first query that finds it. Each query is its
+    own run, with its own run id, journal and output files; `test_limit`
+    applies to each query.
+
+    With a `run_id`, continues that earlier run: the search parameters and
+    output formats come from its journal, results are appended to its
+    output files and jobs it already finished are skipped. With
+    `retry_blocked` as well, only the run's blocked jobs are scraped again.
+
+    With `incremental`, each query only fetches the jobs posted since its
+    last completed incremental run (see `WatermarkStore`).
+
+    API responses are cached on disk for `api_cache_ttl_hours` and
+    revalidated after that. With `offline`, the APIs are never called and
+    searches only see cached responses.
+
+    With `extract_content`, descriptions hold only the posting itself (at
+    most `max_description_chars`), not the whole page's text.
+
+    Descriptions are checked against a persistent near-duplicate index;
+    `near_duplicate_mode` is "skip" (not saved), "mark" (saved with
+    `duplicate_of`) or "off".
+
+    With `worker_processes`, that many processes scrape the jobs, each with
+    its own scraper and `concurrency` scrapes in flight (see `WorkerPool`).
+    This process searches, queues the jobs in a `WorkQueue` and collects
+    the results: it runs the near-duplicate check and the language filter
+    and feeds the writers.
+
+    Run metrics are saved to `data/<run-id>.metrics.json` (named after the
+    batch for a batch), and also written to `metrics_textfile` in the
+    Prometheus text format if given.
     """
     # --- Configuration ---
     # Load environment variables from .env file
     load_dotenv()
     ADZUNA_APP_ID = os.getenv("ADZUNA_APP_ID")
     ADZUNA_APP_KEY = os.getenv("ADZUNA_APP_KEY")
-    WEBSHARE_API_KEY = os.getenv("WEBSHARE_API_KEY")
 
     if not ADZUNA_APP_ID or not ADZUNA_APP_KEY:
-        print("Error: ADZUNA_APP_ID and ADZUNA_APP_KEY must be set in the .env file.")
+        log.error("ADZUNA_APP_ID and ADZUNA_APP_KEY must be set in the .env file.")
         return
 
     # --- Initialization ---
-    adzuna_client = AdzunaClient(app_id=ADZUNA_APP_ID, app_key=ADZUNA_APP_KEY)
-    arbeitnow_client = ArbeitnowClient()
-    job_search = JobSearch(clients=[adzuna_client, arbeitnow_client])
+    # Every run has a journal of each job's progress, named after the run id
+    # like its output files. Continuing a run reuses its search parameters.
+    resuming = run_id is not None
+    if resuming:
+        if not RunJournal.exists(run_id):
+            log.error(f"No journal found for run '{run_id}'.")
+            return
+        with RunJournal(run_id) as journal:
+            params = journal.load_params()
+        search_what = params["search_what"]
+        search_where = params["search_where"]
+        remote_only = params["remote_only"]
+        target_lang = params["target_lang"]
+        test_limit = params["limit"]
+        formats = params["formats"]
+        incremental = params.get("incremental", False)
 
-    # Create a dynamic search term for the filename
-    search_term_prefix = "remote_" if remote_only else ""
-    search_term = f"{search_term_prefix}{search_what}"
-    csv_writer = CSVWriter(search_term=search_term)
-    jsonl_writer = JSONLWriter(search_term=search_term)
-    writers = [csv_writer, jsonl_writer]
-    proxy_manager = ProxyManager(api_key=WEBSHARE_API_KEY) if WEBSHARE_API_KEY else None
-    scraper_service = ScraperService(proxy_manager=proxy_manager)
+    batch = queries is not None
+    if batch:
+        # A batch's metrics cover all of its queries
+        metrics_id = make_run_id("batch")
+        log.info(f"Running a batch of {len(queries)} queries ({metrics_id})")
+    else:
+        queries = [SearchQuery(search_what, search_where, remote_only, target_lang)]
+        run_id = run_id or new_run_id(queries[0].search_term)
+        metrics_id = run_id
 
-    # 1. Fetch the initial list of all jobs
-    print(
-        f"Searching for '{search_what}' jobs in '{search_where}' (Remote: {remote_only})..."
+    api_cache = (
+        ResponseCache(ttl=api_cache_ttl_hours * 3600)
+        if use_api_cache or offline
+        else None
     )
-    initial_jobs = job_search.search(
-        what=search_what, where=search_where, remote_only=remote_only
+    scraper_options = ScraperOptions(
+        cache_ttl_hours=cache_ttl_hours,
+        use_cache=use_cache,
+        block_resources=block_resources,
+        allow_domains=list(allow_domains or ()),
+        http_first=http_first,
+        host_rate=host_rate,
+        use_storage_state=use_storage_state,
+        storage_state_ttl_hours=storage_state_ttl_hours,
+        extract_content=extract_content,
+        max_description_chars=max_description_chars,
     )
+    # With worker processes, each of them sets up its own scraper instead
+    scraper_service = (
+        None
+        if worker_processes
+        else create_scraper_service(scraper_options, create_proxy_manager())
+    )
+    worker_pool = None
+
+    # Drops postings returned by several APIs, under several tracking URLs
+    # or by several queries of a batch
+    deduplicator = JobDeduplicator()
+    watermarks = WatermarkStore() if incremental else None
+    near_duplicates = (
+        NearDuplicateIndex(threshold=near_duplicate_threshold)
+        if near_duplicate_mode != "off"
+        else None
+    )
+    batch_counts = Counter()
+
+    with ExitStack() as shared:
+        # Runs last, so the final writer flushes are included
+        shared.callback(write_metrics, metrics_id, metrics_textfile)
+        if watermarks:
+            shared.callback(watermarks.close)
+        if api_cache:
+            shared.callback(api_cache.close)
+        if near_duplicates:
+            shared.callback(near_duplicates.close)
+        # Each query passes its own target language to the filter
+        language_filter = shared.enter_context(LanguageFilter(queries[0].target_lang))
+
+        async with create_http_session(
+            cache=api_cache, offline=offline
+        ) as http_session:
+            # The API base URLs can point at local stand-ins (see benchmarks/)
+            adzuna_client = AdzunaClient(
+                app_id=ADZUNA_APP_ID,
+                app_key=ADZUNA_APP_KEY,
+                session=http_session,
+                base_url=os.getenv("ADZUNA_API_URL", AdzunaClient.BASE_URL),
+            )
+            arbeitnow_client = ArbeitnowClient(
+                session=http_session,
+                base_url=os.getenv("ARBEITNOW_API_URL", ArbeitnowClient.BASE_URL),
+            )
+            job_search = JobSearch(
+                clients=[adzuna_client, arbeitnow_client],
+                deduplicator=deduplicator,
+                watermarks=watermarks,
+            )
+
+            # The scraper owns a browser pool that lives for the whole
+            # process, across every query of a batch; so do worker processes
+            async with AsyncExitStack() as scraping:
+                if worker_processes:
+                    work_queue = scraping.enter_context(
+                        WorkQueue(os.path.join("data", f"{metrics_id}.queue.sqlite3"))
+                    )
+                    worker_pool = scraping.enter_context(
+                        WorkerPool(
+                            work_queue,
+                            worker_processes,
+                            scraper_options,
+                            concurrency=concurrency,
+                        )
+                    )
+                else:
+                    await scraping.enter_async_context(scraper_service)
+                for number, query in enumerate(queries, start=1):
+                    if batch:
+                        log.info(f"=== Query {number}/{len(queries)}: {query} ===")
+                    counts = await run_query(
+                        query,
+                        job_search,
+                        scraper_service,
+                        language_filter,
+                        test_limit=test_limit,
+                        concurrency=concurrency,
+                        formats=formats,
+                        run_id=run_id,
+                        resuming=resuming,
+                        retry_blocked=retry_blocked,
+                        near_duplicates=near_duplicates,
+                        mark_duplicates=near_duplicate_mode == "mark",
+                        worker_pool=worker_pool,
+                    )
+                    if counts is None:
+                        # Go on with the rest of the batch; cleanup and the summary still run
+                        log.error(f"Skipped query {query}: no output files.")
+                        batch_counts["failed_queries"] += 1
+                        continue
+                    batch_counts.update(counts)
+
+            # Every job has been collected, so the queue has served its purpose
+            if worker_pool:
+                worker_pool.queue.remove()
+        if scraper_service and scraper_service.cache:
+            scraper_service.cache.close()
 
-    if not initial_jobs:
-        print("No jobs found from APIs. Exiting.")
+    if batch:
+        log.info(f"--- Batch of {len(queries)} queries complete. ---")
+        if batch_counts["failed_queries"]:
+            log.info(f"Failed queries: {batch_counts['failed_queries']}")
+        log.info(f"Found from APIs: {batch_counts['found']} jobs")
+        log.info(f"Successfully saved: {batch_counts['saved']} jobs")
+        log.info(f"Blocked by detection: {batch_counts['blocked']} jobs")
+        log.info(f"Filtered by language: {batch_counts['lang_filtered']} jobs")
+        log.info(f"Near-duplicates: {batch_counts['near_duplicates']} jobs")
+        log.info(f"Skipped duplicates: {deduplicator.duplicate_count} jobs")
+    elif not batch_counts["found"]:
         return
 
-    if test_limit > 0:
-        initial_jobs = initial_jobs[:test_limit]
+    log.info(f"Language detection: {language_filter.summary()}")
+    if api_cache:
+        log.info(f"API response cache: {api_cache.summary()}")
+    if near_duplicates:
+        log.info(f"Near-duplicate descriptions: {near_duplicates.summary()}")
+    # Worker processes log their own scraper summaries as they exit
+    if scraper_service:
+        log_scraper_summary(scraper_service)
 
-    print(f"Found {len(initial_jobs)} jobs. Starting scraping and saving process...")
 
-    saved_count = 0
-    blocked_count = 0
-    lang_filtered_count = 0
+async def run_query(
+    query: SearchQuery,
+    job_search: JobSearch,
+    scraper_service: ScraperService | None,
+    language_filter: LanguageFilter,
+    test_limit: int = 0,
+    concurrency: int = 1,
+    formats: list[str] = DEFAULT_FORMATS,
+    run_id: str | None = None,
+    resuming: bool = False,
+    retry_blocked: bool = False,
+    near_duplicates: NearDuplicateIndex | None = None,
+    mark_duplicates: bool = False,
+    worker_pool: WorkerPool | None = None,
+) -> Counter | None:
+    """
+    Runs one search through the pipeline with its own journal and output
+    files, using the services `main` set up. Jobs are scraped by
+    `scraper_service`, or by the processes of `worker_pool` if given.
+    Returns the query's counters, or None if its writers couldn't be
+    created.
+    """
+    run_id = run_id or new_run_id(query.search_term)
+    try:
+        writers = [
+            WRITER_CLASSES[fmt](search_term=query.search_term, run_id=run_id)
+            for fmt in formats
+        ]
+    except ImportError as e:
+        log.error(str(e))
+        return None
+    journal = RunJournal(run_id)
+    if not resuming:
+        journal.save_params(
+            {
+                "search_what": query.what,
+                "search_where": query.where,
+                "remote_only": query.remote_only,
+                "target_lang": query.target_lang,
+                "limit": test_limit,
+                "formats": formats,
+                "incremental": job_search.watermarks is not None,
+            }
+        )
 
-    # 2. Loop through each job, enrich it, and save it immediately
-    for index, job in enumerate(initial_jobs):
-        print(f"--- Processing job {index + 1}/{len(initial_jobs)} ---")
+    counts = Counter(
+        found=0,
+        saved=0,
+        blocked=0,
+        lang_filtered=0,
+        near_duplicates=0,
+        already_done=0,
+    )
+    duplicates_before = job_search.deduplicator.duplicate_count
 
-        enriched_job = await scraper_service.enrich_job(job)
+    # Jobs flow from the API clients to the scrapers through a bounded queue,
+    # so scraping starts as soon as the first page arrives and a large search
+    # never has to sit in memory all at once. Worker processes get them
+    # through the pool's work queue on disk instead.
+    workers = max(1, concurrency)
+    job_queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+    work_queue = worker_pool.queue if worker_pool else None
+    search_done = asyncio.Event()
 
-        if not enriched_job:
-            continue
+    async def enqueue(job: Job):
+        if work_queue:
+            work_queue.put(job, run_id, refresh=retry_blocked)
+        else:
+            await job_queue.put(job)
 
-        scrape_successful = (
-            enriched_job.job_description
-            and "SCRAPING" not in enriched_job.job_description
+    if retry_blocked:
+        log.info(f"Retrying the blocked jobs of run {run_id}")
+    elif resuming:
+        progress = ", ".join(
+            f"{count} {state}" for state, count in journal.state_counts().items()
         )
-        should_save = True  # Default to saving every record
+        log.info(f"Resuming run {run_id} ({progress or 'no jobs yet'})")
+    else:
+        log.info(f"Run ID: {run_id} (continue it later with --resume {run_id})")
 
-        # Only perform language filtering if we have a valid description
-        if scrape_successful:
-            try:
-                detected_lang = detect(enriched_job.job_description)
-                if detected_lang != target_lang:
-                    print(
-                        f"  -> Skipping save: Language '{detected_lang}' does not match target '{target_lang}'."
+    # Writers keep their files open for the whole run and write in batches.
+    # Leaving this block, whether normally, on an error or on a shutdown
+    # signal, flushes and fsyncs whatever is still buffered. The journal is
+    # closed (and committed) after the writers.
+    with ExitStack() as open_writers:
+        open_writers.enter_context(journal)
+        for writer in writers:
+            open_writers.enter_context(writer)
+        install_shutdown_handler(writers)
+
+        # 1. Stream jobs from all APIs concurrently. All clients share one
+        #    pooled HTTP session; --limit stops the search early. Jobs this
+        #    run already has in its journal are not queued again.
+        async def producer():
+            if retry_blocked:
+                for job in journal.jobs((STATE_BLOCKED,)):
+                    counts["found"] += 1
+                    await enqueue(job)
+            else:
+                # Jobs an interrupted attempt found but didn't finish
+                for job in journal.jobs((STATE_PENDING, STATE_SCRAPED)):
+                    counts["found"] += 1
+                    await enqueue(job)
+                next_index = journal.next_index()
+                log.info(
+                    f"Searching for '{query.what}' jobs in '{query.where}' (Remote: {query.remote_only})..."
+                )
+                async for job in job_search.stream(
+                    what=query.what,
+                    where=query.where,
+                    remote_only=query.remote_only,
+                    limit=test_limit,
+                ):
+                    state = journal.state(job)
+                    if state is not None:
+                        # Pending and scraped jobs were requeued above
+                        if state not in (STATE_PENDING, STATE_SCRAPED):
+                            counts["already_done"] += 1
+                        continue
+                    job.source_index = next_index
+                    next_index += 1
+                    counts["found"] += 1
+                    journal.record(job, STATE_PENDING)
+                    await enqueue(job)
+            search_done.set()
+            # One end-of-search marker per worker
+            if not work_queue:
+                for _ in range(workers):
+                    await job_queue.put(None)
+
+        # 2. Enrich each job and save it as soon as it finishes. A pool of
+        #    `concurrency` workers keeps that many scrapes in flight; results
+        #    are written in completion order. The scraper paces requests per
+        #    host.
+        async def worker():
+            while True:
+                job = await job_queue.get()
+                if job is None:
+                    return
+                log.info(f"--- Processing job {job.source_index + 1} ---")
+                await process_job(
+                    job,
+                    scraper_service,
+                    writers,
+                    language_filter,
+                    counts,
+                    journal,
+                    refresh=retry_blocked,
+                    target_lang=query.target_lang,
+                    near_duplicates=near_duplicates,
+                    mark_duplicates=mark_duplicates,
+                )
+
+        # 2b. With worker processes, this process only collects their results
+        #     and saves them, in completion order. It also keeps the pool
+        #     running: jobs leased by a worker that died or hung go back in
+        #     the queue.
+        async def collector():
+            idle = COLLECT_INTERVAL
+            while True:
+                worker_pool.check()
+                tasks = work_queue.collect(run_id)
+                for task in tasks:
+                    if task.failed:
+                        log.warning(
+                            f"Giving up on {task.job.url}: its workers kept dying on it."
+                        )
+                        task.job.job_description = "SCRAPING_BLOCKED_MAX_RETRIES"
+                    await save_job(
+                        task.job,
+                        writers,
+                        language_filter,
+                        counts,
+                        journal,
+                        target_lang=query.target_lang,
+                        near_duplicates=near_duplicates,
+                        mark_duplicates=mark_duplicates,
                     )
-                    should_save = False  # Override the default
-                    lang_filtered_count += 1
-            except LangDetectException:
-                print(
+                    work_queue.ack(task.id)
+                if tasks:
+                    idle = COLLECT_INTERVAL
+                    continue
+                if search_done.is_set() and not work_queue.outstanding(run_id):
+                    return
+                await asyncio.sleep(idle)
+                idle = min(idle * 2, MAX_COLLECT_INTERVAL)
+
+        checkpoints = asyncio.create_task(checkpoint_periodically(writers, journal))
+        try:
+            if work_queue:
+                await asyncio.gather(producer(), collector())
+            else:
+                await asyncio.gather(producer(), *(worker() for _ in range(workers)))
+        finally:
+            checkpoints.cancel()
+
+    # Every job the search handed out is now done (or journaled as blocked),
+    # so the next incremental run can start after them
+    if job_search.watermarks:
+        job_search.watermarks.commit()
+    counts["duplicates"] = job_search.deduplicator.duplicate_count - duplicates_before
+    if not counts["found"]:
+        if retry_blocked:
+            log.info("No blocked jobs to retry.")
+        elif counts["already_done"]:
+            log.info("Every job of this run is already done.")
+        else:
+            log.info("No jobs found from APIs.")
+        return counts
+
+    log.info("--- Job search and export complete. ---")
+    log.info(f"Run ID: {run_id}")
+    if retry_blocked:
+        log.info(f"Retried: {counts['found']} blocked jobs")
+    else:
+        log.info(f"Found from APIs: {counts['found']} jobs")
+    if counts["already_done"]:
+        log.info(f"Already done by this run: {counts['already_done']} jobs")
+    log.info(f"Skipped duplicates: {counts['duplicates']} jobs")
+    log.info(f"Successfully saved: {counts['saved']} jobs")
+    log.info(
+        f"Blocked by detection: {counts['blocked']} jobs"
+        + (f" (retry with --retry-blocked {run_id})" if counts["blocked"] else "")
+    )
+    log.info(f"Filtered by language: {counts['lang_filtered']} jobs")
+    if near_duplicates:
+        log.info(
+            f"Near-duplicates {'marked' if mark_duplicates else 'skipped'}: "
+            f"{counts['near_duplicates']} jobs"
+        )
+    return counts
+
+
+def new_run_id(search_term: str) -> str:
+    """
+    A run id no earlier run has a journal for. Batch queries with the same
+    keyword (e.g. in different cities) start within the same second, so
+    later ones get a numbered suffix instead of sharing files and journal.
+    """
+    base = make_run_id(search_term)
+    run_id = base
+    number = 2
+    while RunJournal.exists(run_id):
+        run_id = f"{base}_{number}"
+        number += 1
+    return run_id
+
+
+def write_metrics(run_id: str, textfile: str | None = None):
+    """Saves the run metrics as JSON, and as a Prometheus textfile if asked."""
+    path = os.path.join("data", f"{run_id}.metrics.json")
+    metrics.write_json(path)
+    log.info(f"Run metrics saved to {path}")
+    if textfile:
+        metrics.write_prometheus(textfile)
+
+
+async def checkpoint_periodically(writers: list[DataWriter], journal: RunJournal):
+    """
+    Checkpoints writers whose `flush_interval` has passed even while no
+    new records arrive (e.g. during a slow scrape), then commits the journal
+    once nothing is left unsynced.
+    """
+    while True:
+        await asyncio.sleep(CHECKPOINT_INTERVAL)
+        try:
+            for writer in writers:
+                writer.flush_if_due()
+        except OSError as e:
+            log.error(f"Error checkpointing output files: {e}")
+            continue
+        if not has_unsynced_records(writers):
+            journal.commit()
+
+
+def has_unsynced_records(writers: list[DataWriter]) -> bool:
+    """
+    True while a writer has records a crash could still lose. Writers that
+    can't checkpoint (Parquet) are left out, or the journal would never be
+    committed before they close.
+    """
+    return any(writer.pending_records for writer in writers if writer.checkpoints)
+
+
+def install_shutdown_handler(writers: list[DataWriter]):
+    """
+    On SIGTERM/SIGHUP, checkpoints the writers and cancels the run so it
+    unwinds (and closes everything) the same way Ctrl-C does.
+    """
+    loop = asyncio.get_running_loop()
+    main_task = asyncio.current_task()
+
+    def shutdown(signame: str):
+        log.warning(f"Received {signame}, saving buffered records and stopping...")
+        for writer in writers:
+            writer.flush()
+        main_task.cancel()
+
+    for signame in ("SIGTERM", "SIGHUP"):
+        if hasattr(signal, signame):
+            try:
+                loop.add_signal_handler(getattr(signal, signame), shutdown, signame)
+            except NotImplementedError:
+                pass  # Not supported by the Windows event loop
+
+
+async def process_job(
+    job: Job,
+    scraper_service: ScraperService,
+    writers: list[DataWriter],
+    language_filter: LanguageFilter,
+    counts: Counter,
+    journal: RunJournal,
+    refresh: bool = False,
+    target_lang: str | None = None,
+    near_duplicates: NearDuplicateIndex | None = None,
+    mark_duplicates: bool = False,
+):
+    """
+    Scrapes a single job and hands it to `save_job`. With `refresh`, the
+    scrape cache is bypassed.
+    """
+    started = time.perf_counter()
+    enriched_job = await scraper_service.enrich_job(job, refresh=refresh)
+
+    if not enriched_job:
+        return
+
+    await save_job(
+        enriched_job,
+        writers,
+        language_filter,
+        counts,
+        journal,
+        target_lang=target_lang,
+        near_duplicates=near_duplicates,
+        mark_duplicates=mark_duplicates,
+    )
+    metrics.observe("job_seconds", time.perf_counter() - started)
+
+
+async def save_job(
+    enriched_job: Job,
+    writers: list[DataWriter],
+    language_filter: LanguageFilter,
+    counts: Counter,
+    journal: RunJournal,
+    target_lang: str | None = None,
+    near_duplicates: NearDuplicateIndex | None = None,
+    mark_duplicates: bool = False,
+):
+    """
+    Applies the language filter to a scraped job and writes it out,
+    updating the shared run counters and the job's state in the journal.
+    `target_lang` overrides the language filter's own target. With
+    `near_duplicates`, a description that nearly duplicates an earlier one
+    is skipped, or with `mark_duplicates` saved with `duplicate_of` set.
+    The job's description is dropped once it has been written out.
+    """
+    target_lang = target_lang or language_filter.target_lang
+    scrape_successful = (
+        enriched_job.job_description and "SCRAPING" not in enriched_job.job_description
+    )
+    should_save = True  # Default to saving every record
+    state = STATE_SAVED
+
+    # Only perform language filtering if we have a valid description. The
+    # detection itself runs in the language filter's worker processes.
+    if scrape_successful:
+        journal.record(enriched_job, STATE_SCRAPED)
+        # Reposts of a description seen before (in this run or an earlier
+        # one) are skipped before language detection, or only marked
+        duplicate_of = near_duplicates.check(enriched_job) if near_duplicates else None
+        if duplicate_of:
+            counts["near_duplicates"] += 1
+            enriched_job.duplicate_of = duplicate_of
+        if duplicate_of and not mark_duplicates:
+            log.info(f"  -> Skipping save: Near-duplicate of {duplicate_of}.")
+            should_save = False
+            state = STATE_DUPLICATE
+        else:
+            is_target_lang, detected_lang = await language_filter.matches(
+                enriched_job.job_description, target_lang
+            )
+            if detected_lang is None:
+                log.info(
                     "  -> Skipping save: Could not detect language from job description."
                 )
                 should_save = False
-                lang_filtered_count += 1
-        else:
-            blocked_count += 1
+                counts["lang_filtered"] += 1
+                state = STATE_FILTERED
+            elif not is_target_lang:
+                log.info(
+                    f"  -> Skipping save: Language '{detected_lang}' does not match target '{target_lang}'."
+                )
+                should_save = False  # Override the default
+                counts["lang_filtered"] += 1
+                state = STATE_FILTERED
+    else:
+        counts["blocked"] += 1
+        state = STATE_BLOCKED
 
-        # Save the job if it wasn't filtered out
-        if should_save:
-            print("  -> Saving job record.")
-            for writer in writers:
-                writer.append_job(enriched_job)
-            saved_count += 1
+    # Save the job if it wasn't filtered out
+    if should_save:
+        log.debug(f"  -> Saving job record #{enriched_job.source_index + 1}.")
+        for writer in writers:
+            writer.append_job(enriched_job)
+        counts["saved"] += 1
 
-        if index < len(initial_jobs) - 1:
-            await asyncio.sleep(random.uniform(1, 3))
+    journal.record(enriched_job, state)
+    metrics.inc("jobs_total", state=state)
+    # Only commit the journal once the writers have checkpointed, so it never
+    # marks a job as saved while its record could still be lost in a crash
+    if not has_unsynced_records(writers):
+        journal.commit()
 
-    print("\n--- Job search and export complete. ---")
-    print(f"Successfully saved: {saved_count} jobs")
-    print(f"Blocked by detection: {blocked_count} jobs (URLs saved for retry)")
-    print(f"Filtered by language: {lang_filtered_count} jobs")
+    # The dedup index holds on to every job until the run ends, so release
+    # the page text once it has been written; it is never needed again
+    enriched_job.job_description = None
 
 
 if __name__ == "__main__":
@@ -126,10 +732,14 @@ if __name__ == "__main__":
     parser.add_argument(
         "search_what",
         type=str,
+        nargs="?",
         help="The job title or keyword to search for (e.g., 'software engineer').",
     )
     parser.add_argument(
-        "search_where", type=str, help="The location to search in (e.g., 'USA')."
+        "search_where",
+        type=str,
+        nargs="?",
+        help="The location to search in (e.g., 'USA').",
     )
     parser.add_argument(
         "--remote",
@@ -150,7 +760,175 @@ if __name__ == "__main__":
         help="Limit the number of jobs to scrape for testing purposes (e.g., --limit 5).",
     )
 
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Number of jobs to scrape in parallel (e.g., --concurrency 4). Default: 1",
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Scrape in this many worker processes, each with its own browsers and --concurrency scrapes in flight (e.g. --workers 4 on a many-core machine). Default: 0 (scrape in this process)",
+    )
+
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=168,
+        help="How many hours a scraped page stays in the local scrape cache. Default: 168 (one week)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Add this flag to always scrape pages instead of using the local scrape cache.",
+    )
+
+    parser.add_argument(
+        "--api-cache-ttl",
+        type=float,
+        default=1,
+        help="How many hours a cached API response is used before it is revalidated. Default: 1",
+    )
+    parser.add_argument(
+        "--no-api-cache",
+        action="store_true",
+        help="Add this flag to always call the job APIs instead of using the local API response cache.",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Only use cached API responses and never call the job APIs (job pages are still scraped unless cached).",
+    )
+
+    parser.add_argument(
+        "--max-description-chars",
+        type=int,
+        default=20000,
+        help="Cut job descriptions to this many characters (0 for no limit). Default: 20000",
+    )
+    parser.add_argument(
+        "--no-extract",
+        action="store_true",
+        help="Add this flag to save each page's full text instead of only the job posting.",
+    )
+
+    parser.add_argument(
+        "--near-duplicates",
+        choices=["skip", "mark", "off"],
+        default="skip",
+        help="What to do with jobs whose description nearly duplicates an earlier posting's (e.g. reposts by agencies): skip them, save them with duplicate_of set, or don't check. Default: skip",
+    )
+    parser.add_argument(
+        "--near-duplicate-threshold",
+        type=float,
+        default=0.9,
+        help="How similar (0-1, estimated Jaccard over word shingles) two descriptions must be to count as near-duplicates. Default: 0.9",
+    )
+
+    parser.add_argument(
+        "--no-block-resources",
+        action="store_true",
+        help="Add this flag to load images, fonts, media and trackers while scraping.",
+    )
+    parser.add_argument(
+        "--allow-domain",
+        action="append",
+        default=[],
+        help="Job site that needs its third-party scripts to render (repeatable).",
+    )
+
+    parser.add_argument(
+        "--browser-only",
+        action="store_true",
+        help="Add this flag to always scrape with a browser, skipping the plain HTTP fast path.",
+    )
+
+    parser.add_argument(
+        "--format",
+        nargs="+",
+        choices=sorted(WRITER_CLASSES),
+        default=DEFAULT_FORMATS,
+        help="Output formats to write (e.g., --format csv parquet). Default: csv jsonl",
+    )
+
+    parser.add_argument(
+        "--host-rate",
+        type=float,
+        default=0.5,
+        help="Starting requests per second to each job site; adapts to blocks and timeouts. Default: 0.5",
+    )
+
+    parser.add_argument(
+        "--storage-state-ttl",
+        type=float,
+        default=24,
+        help="How many hours a job site's saved browser cookies and localStorage are reused. Default: 24",
+    )
+    parser.add_argument(
+        "--no-storage-state",
+        action="store_true",
+        help="Add this flag to start every browser context without saved cookies or localStorage.",
+    )
+
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only fetch jobs posted since the last --incremental run of the same search.",
+    )
+
+    parser.add_argument(
+        "--metrics-textfile",
+        help="Also write the run metrics to this file in the Prometheus text format (e.g. for node_exporter's textfile collector).",
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        default="INFO",
+        help="How much progress output to show. Default: INFO",
+    )
+
+    run_mode = parser.add_mutually_exclusive_group()
+    run_mode.add_argument(
+        "--queries",
+        metavar="FILE",
+        help="Run every search in this CSV file (columns: what,where,remote,lang) in one process, each to its own output files.",
+    )
+    run_mode.add_argument(
+        "--resume",
+        metavar="RUN_ID",
+        help="Continue an interrupted run, appending to its output files and skipping finished jobs.",
+    )
+    run_mode.add_argument(
+        "--retry-blocked",
+        metavar="RUN_ID",
+        help="Scrape the jobs a previous run was blocked on again, appending to its output files.",
+    )
+
     args = parser.parse_args()
+    logging.basicConfig(
+        level=args.log_level, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    if not (args.resume or args.retry_blocked or args.queries) and not (
+        args.search_what and args.search_where
+    ):
+        parser.error(
+            "search_what and search_where are required unless --queries, --resume or --retry-blocked is given"
+        )
+    if args.offline and args.no_api_cache:
+        parser.error("--offline needs the API cache; drop --no-api-cache")
+    if args.host_rate <= 0:
+        parser.error("--host-rate must be greater than 0")
+    if args.workers < 0:
+        parser.error("--workers must be 0 or more")
+    queries = None
+    if args.queries:
+        try:
+            queries = load_queries(args.queries, default_lang=args.lang)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
 
     asyncio.run(
         main(
@@ -159,5 +937,28 @@ if __name__ == "__main__":
             remote_only=args.remote,
             target_lang=args.lang,
             test_limit=args.limit,
+            concurrency=args.concurrency,
+            cache_ttl_hours=args.cache_ttl,
+            use_cache=not args.no_cache,
+            block_resources=not args.no_block_resources,
+            allow_domains=args.allow_domain,
+            http_first=not args.browser_only,
+            formats=args.format,
+            host_rate=args.host_rate,
+            run_id=args.resume or args.retry_blocked,
+            retry_blocked=args.retry_blocked is not None,
+            metrics_textfile=args.metrics_textfile,
+            use_storage_state=not args.no_storage_state,
+            storage_state_ttl_hours=args.storage_state_ttl,
+            queries=queries,
+            incremental=args.incremental,
+            use_api_cache=not args.no_api_cache,
+            api_cache_ttl_hours=args.api_cache_ttl,
+            offline=args.offline,
+            extract_content=not args.no_extract,
+            max_description_chars=args.max_description_chars,
+            near_duplicate_mode=args.near_duplicates,
+            near_duplicate_threshold=args.near_duplicate_threshold,
+            worker_processes=args.workers,
         )
     )
@@ -2,10 +2,11 @@ from dataclasses import dataclass
 from typing import Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class Job:
     """
     Dataclass to represent a standardized job listing.
+    Slotted, so the many jobs held by a large run carry no per-instance dict.
     """
 
     title: str
@@ -14,3 +15,7 @@ class Job:
     url: str
     email: Optional[str] = None
     job_description: Optional[str] = None
+    source_index: Optional[int] = None  # Position in the original search results
+    posted_at: Optional[str] = None  # UTC ISO 8601, when the API provides it
+    source_id: Optional[str] = None  # The posting's id in its API
+    duplicate_of: Optional[str] = None  # URL of the posting this one reposts
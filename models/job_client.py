@@ -1,12 +1,128 @@
+import asyncio
 from abc import ABC, abstractmethod
+from typing import AsyncIterator, Awaitable, Callable
+import httpx
 from models.job import Job
+from models.watermark import Watermark
+
+
+class LastPage(list):
+    """
+    The empty page that closes a client's results when it's known how much
+    of the listing they cover: all of it, or, with `oldest_posted_at`, every
+    job of a newest-first listing from the top down to that posting time
+    (pagination stopped at jobs an earlier run returned, or at the page
+    limit). Jobs an earlier run returned count as covered.
+    """
+
+    def __init__(self, jobs=(), oldest_posted_at: str | None = None):
+        super().__init__(jobs)
+        self.oldest_posted_at = oldest_posted_at
 
 
 class JobClient(ABC):
     """
     Abstract base class for a job client.
+    Clients share a pooled async HTTP session, passed in at construction.
     """
 
+    def __init__(self, session: httpx.AsyncClient):
+        self.session = session
+
     @abstractmethod
-    def get_jobs(self, what, where) -> list[Job]:
+    def iter_pages(
+        self,
+        what,
+        where,
+        remote_only: bool = False,
+        since: Watermark | None = None,
+    ) -> AsyncIterator[list[Job]]:
+        """
+        Async generator yielding the jobs of each results page as it arrives.
+        This must be implemented by all subclasses.
+
+        With `since` (incremental searches, where the watermark may still be
+        empty), clients list the newest jobs first, only yield jobs the
+        watermark doesn't cover, and stop paginating once they reach
+        covered ones.
+        """
         pass
+
+    async def get_jobs(self, what, where, remote_only: bool = False) -> list[Job]:
+        """Collects every page from `iter_pages` into a single list."""
+        all_jobs = []
+        async for jobs in self.iter_pages(what, where, remote_only=remote_only):
+            all_jobs.extend(jobs)
+        return all_jobs
+
+    async def _iter_paginated(
+        self,
+        fetch_page: Callable[[int], Awaitable[list[Job]]],
+        max_pages: int,
+        page_window: int,
+        since: Watermark | None = None,
+    ) -> AsyncIterator[list[Job]]:
+        """
+        Fetches pages 1..max_pages, `page_window` pages at a time in parallel,
+        yielding each page as soon as it completes. Stops after the first
+        window that contains an empty page, and then yields an empty
+        `LastPage` to mark that every result was returned. If it stops at
+        `max_pages` instead, results may be left. `fetch_page` raises
+        `httpx.HTTPError` for a page it couldn't fetch; that isn't the end
+        of the listing, so pagination stops after the window without a
+        `LastPage`.
+
+        With `since`, the listing must be newest first. Jobs the watermark
+        covers are dropped, and a page that reaches the watermark or has
+        nothing new is the last. Pagination that stops there or at
+        `max_pages` closes with a `LastPage` giving the oldest posting time
+        it got down to.
+        """
+        oldest = None
+        first_page = 1
+        while first_page <= max_pages:
+            last_page = min(first_page + page_window - 1, max_pages)
+            exhausted = reached = failed = False
+            tasks = [
+                asyncio.ensure_future(fetch_page(page))
+                for page in range(first_page, last_page + 1)
+            ]
+            try:
+                for next_page in asyncio.as_completed(tasks):
+                    try:
+                        jobs = await next_page
+                    except httpx.HTTPError:
+                        # The client logged it; keep the rest of the window
+                        failed = True
+                        continue
+                    if not jobs:
+                        exhausted = True
+                        continue
+                    if since is not None:
+                        oldest = min(
+                            filter(None, [oldest] + [job.posted_at for job in jobs]),
+                            default=None,
+                        )
+                        # Covered jobs are dropped; the search ends at the
+                        # first page that gets to older jobs, or that only
+                        # has jobs an earlier run already returned
+                        new_jobs = [job for job in jobs if not since.covers(job)]
+                        if not new_jobs or any(since.reached(job) for job in jobs):
+                            reached = True
+                        jobs = new_jobs
+                    if jobs:
+                        yield jobs
+            finally:
+                # Don't leave requests running if the consumer stops early.
+                for task in tasks:
+                    task.cancel()
+            if failed:
+                return
+            if exhausted:
+                yield LastPage()
+                return
+            if reached:
+                break
+            first_page = last_page + 1
+        if since is not None and oldest:
+            yield LastPage(oldest_posted_at=oldest)
@@ -0,0 +1,57 @@
+import csv
+from dataclasses import dataclass
+
+TRUE_VALUES = {"1", "true", "yes", "y", "remote"}
+
+
+@dataclass
+class SearchQuery:
+    """One job search: what to look for, where, and the language to keep."""
+
+    what: str
+    where: str
+    remote_only: bool = False
+    target_lang: str = "en"
+
+    @property
+    def search_term(self) -> str:
+        """Names the query's output files."""
+        prefix = "remote_" if self.remote_only else ""
+        return f"{prefix}{self.what}"
+
+    def __str__(self) -> str:
+        remote = ", remote" if self.remote_only else ""
+        return f"'{self.what}' in '{self.where}' ({self.target_lang}{remote})"
+
+
+def load_queries(path: str, default_lang: str = "en") -> list[SearchQuery]:
+    """
+    Reads a queries file: CSV with a `what,where,remote,lang` header row.
+    `remote` and `lang` may be left out or empty (not remote, and
+    `default_lang`). Blank lines and lines starting with '#' are skipped.
+
+    :raises ValueError: If the file has no queries or a row misses `what`
+        or `where`.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        lines = [
+            line for line in f if line.strip() and not line.lstrip().startswith("#")
+        ]
+
+    queries = []
+    for number, row in enumerate(csv.DictReader(lines), start=1):
+        what = (row.get("what") or "").strip()
+        where = (row.get("where") or "").strip()
+        if not what or not where:
+            raise ValueError(f"{path}: query {number} needs both 'what' and 'where'")
+        queries.append(
+            SearchQuery(
+                what=what,
+                where=where,
+                remote_only=(row.get("remote") or "").strip().lower() in TRUE_VALUES,
+                target_lang=(row.get("lang") or "").strip() or default_lang,
+            )
+        )
+    if not queries:
+        raise ValueError(f"{path}: no queries found")
+    return queries
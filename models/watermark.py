@@ -0,0 +1,64 @@
+import math
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from models.job import Job
+
+POSTED_AT_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def format_posted_at(value: datetime) -> str:
+    """Normalizes a posting time to UTC ISO 8601, which sorts as text."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime(POSTED_AT_FORMAT)
+
+
+@dataclass
+class Watermark:
+    """
+    How far one client got for one query: a range of posting times in which
+    it has returned every posting, from `oldest_posted_at` (or from the
+    oldest posting, if None) up to `newest_posted_at`, and the ids of the
+    postings it returned most recently (including those of runs that
+    stopped early).
+    """
+
+    newest_posted_at: str | None = None
+    seen_ids: list[str] = field(default_factory=list)
+    oldest_posted_at: str | None = None
+
+    def __post_init__(self):
+        self._seen = set(self.seen_ids)
+
+    def covers(self, job: Job) -> bool:
+        """True if the job was already returned by an earlier run."""
+        if job.source_id is not None and job.source_id in self._seen:
+            return True
+        # Postings at exactly the newest time may still be new
+        return bool(
+            job.posted_at
+            and self.newest_posted_at
+            and job.posted_at < self.newest_posted_at
+            and (
+                self.oldest_posted_at is None or job.posted_at >= self.oldest_posted_at
+            )
+        )
+
+    def reached(self, job: Job) -> bool:
+        """
+        True if a newest-first listing has got past the postings earlier
+        runs may have missed, so it can stop: the job is older than the
+        newest posting time, or (without a time) was returned before.
+        """
+        if job.posted_at:
+            return bool(self.newest_posted_at) and job.posted_at < self.newest_posted_at
+        return job.source_id is not None and job.source_id in self._seen
+
+    def max_days_old(self) -> int | None:
+        """Whole days back to the newest posting, for APIs that filter by age."""
+        if not self.newest_posted_at:
+            return None
+        newest = datetime.strptime(self.newest_posted_at, POSTED_AT_FORMAT)
+        age = time.time() - newest.replace(tzinfo=timezone.utc).timestamp()
+        return max(1, math.ceil(age / 86400))
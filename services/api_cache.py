@@ -0,0 +1,225 @@
+import json
+import os
+import sqlite3
+import time
+import zlib
+from urllib.parse import urlencode
+import httpx
+from .metrics import metrics
+
+API_CACHE_DB = "data/api_cache.sqlite3"
+
+# Query parameters left out of cache keys: secrets that don't change results
+EXCLUDED_PARAMS = {"app_key"}
+# Response headers kept with a cached body
+STORED_HEADERS = ("content-type", "etag", "last-modified")
+
+
+def cache_key(url: httpx.URL) -> str:
+    """The URL with its query parameters sorted and secrets removed."""
+    params = sorted(
+        (key, value)
+        for key, value in url.params.multi_items()
+        if key not in EXCLUDED_PARAMS
+    )
+    base = f"{url.scheme}://{url.netloc.decode('ascii')}{url.path}"
+    return f"{base}?{urlencode(params)}" if params else base
+
+
+class ResponseCache:
+    """
+    A persistent, SQLite-backed cache of API responses, stored
+    zlib-compressed with their validators (ETag and Last-Modified).
+
+    Entries are fresh for `ttl` seconds. Stale entries are kept, so they can
+    be revalidated with a conditional request or served in offline mode.
+    Once the stored bodies exceed `max_bytes`, the least recently used
+    entries are evicted.
+    """
+
+    EVICT_EVERY = 50  # Check the size limit once per this many writes
+
+    def __init__(
+        self,
+        path: str = API_CACHE_DB,
+        ttl: float = 3600,
+        max_bytes: int = 100 * 1024 * 1024,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._writes = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS api_cache (
+                key TEXT PRIMARY KEY,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                stored_at REAL NOT NULL,
+                last_accessed REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+            """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_api_cache_lru ON api_cache (last_accessed)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> dict | None:
+        """
+        Returns the entry for a key as a dict with `headers`, `body`
+        (decompressed), `stored_at` and `fresh`, or None if there's none.
+        """
+        row = self._conn.execute(
+            "SELECT headers, body, stored_at FROM api_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        headers, body, stored_at = row
+        self._conn.execute(
+            "UPDATE api_cache SET last_accessed = ? WHERE key = ?", (time.time(), key)
+        )
+        self._conn.commit()
+        return {
+            "headers": json.loads(headers),
+            "body": zlib.decompress(body),
+            "stored_at": stored_at,
+            "fresh": time.time() - stored_at < self.ttl,
+        }
+
+    def put(self, key: str, headers: dict, body: bytes):
+        """Stores (or replaces) the response for a key."""
+        now = time.time()
+        compressed = zlib.compress(body, 6)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO api_cache"
+            " (key, headers, body, stored_at, last_accessed, size)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (key, json.dumps(headers), compressed, now, now, len(compressed)),
+        )
+        self._conn.commit()
+
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            self.evict()
+
+    def touch(self, key: str):
+        """Marks an entry as fresh again after the server confirmed it (304)."""
+        now = time.time()
+        self._conn.execute(
+            "UPDATE api_cache SET stored_at = ?, last_accessed = ? WHERE key = ?",
+            (now, now, key),
+        )
+        self._conn.commit()
+
+    def evict(self):
+        """Drops the least recently used entries until the cache fits."""
+        (total,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM api_cache"
+        ).fetchone()
+        if total > self.max_bytes:
+            excess = total - self.max_bytes
+            freed = 0
+            doomed = []
+            for key, size in self._conn.execute(
+                "SELECT key, size FROM api_cache ORDER BY last_accessed"
+            ):
+                if freed >= excess:
+                    break
+                doomed.append((key,))
+                freed += size
+            self._conn.executemany("DELETE FROM api_cache WHERE key = ?", doomed)
+        self._conn.commit()
+
+    def summary(self) -> str:
+        return f"{self.hits} hits, {self.revalidated} revalidated, {self.misses} misses"
+
+    def close(self):
+        self._conn.close()
+
+
+class CachingTransport(httpx.AsyncBaseTransport):
+    """
+    An httpx transport that answers GET requests from a `ResponseCache`.
+
+    Fresh entries are served without a request. Stale ones are revalidated
+    with If-None-Match/If-Modified-Since, and a 304 serves the cached body.
+    Successful responses are stored. In `offline` mode nothing is sent:
+    cached entries are served however old they are, and anything else gets
+    a 504 response.
+    """
+
+    def __init__(
+        self,
+        cache: ResponseCache,
+        transport: httpx.AsyncBaseTransport,
+        offline: bool = False,
+    ):
+        self.cache = cache
+        self.transport = transport
+        self.offline = offline
+
+    def _cached_response(self, request: httpx.Request, entry: dict) -> httpx.Response:
+        return httpx.Response(
+            200, headers=entry["headers"], content=entry["body"], request=request
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method != "GET":
+            return await self.transport.handle_async_request(request)
+
+        key = cache_key(request.url)
+        entry = self.cache.get(key)
+        if entry and (entry["fresh"] or self.offline):
+            self.cache.hits += 1
+            metrics.inc("api_cache_total", outcome="hit")
+            return self._cached_response(request, entry)
+        if self.offline:
+            self.cache.misses += 1
+            metrics.inc("api_cache_total", outcome="offline_miss")
+            return httpx.Response(
+                504, text="Not in the API cache (offline mode)", request=request
+            )
+
+        if entry:
+            validators = entry["headers"]
+            if "etag" in validators:
+                request.headers["If-None-Match"] = validators["etag"]
+            if "last-modified" in validators:
+                request.headers["If-Modified-Since"] = validators["last-modified"]
+
+        response = await self.transport.handle_async_request(request)
+        if entry and response.status_code == 304:
+            await response.aclose()
+            self.cache.touch(key)
+            self.cache.revalidated += 1
+            metrics.inc("api_cache_total", outcome="revalidated")
+            return self._cached_response(request, entry)
+
+        self.cache.misses += 1
+        metrics.inc("api_cache_total", outcome="miss")
+        if response.status_code != 200:
+            return response
+
+        # Read (and decode) the body so it can be stored; the response handed
+        # back carries the decoded body, so its encoding headers are dropped
+        try:
+            body = await response.aread()
+        finally:
+            await response.aclose()
+        headers = {
+            name: response.headers[name]
+            for name in STORED_HEADERS
+            if name in response.headers
+        }
+        self.cache.put(key, headers, body)
+        return httpx.Response(200, headers=headers, content=body, request=request)
+
+    async def aclose(self):
+        await self.transport.aclose()
@@ -0,0 +1,140 @@
+import asyncio
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright, Browser, BrowserContext
+from playwright_stealth import Stealth
+from .metrics import metrics
+
+LOCAL_IDENTITY = "local"
+
+
+class _PooledBrowser:
+    """
+    Bookkeeping for one launched browser: how many pages it has served and
+    how many contexts are currently open on it.
+    """
+
+    def __init__(self, browser: Browser):
+        self.browser = browser
+        self.pages_served = 0
+        self.active_contexts = 0
+        self.retired = False
+
+
+class BrowserPool:
+    """
+    A long-lived pool of Chromium browsers, one per proxy identity.
+
+    Browsers are launched lazily on first use and hand out a fresh
+    BrowserContext per job. A browser is recycled once it has served
+    `max_pages_per_browser` pages or after it disconnects (crash), so a long
+    run does not accumulate renderer memory.
+    """
+
+    def __init__(self, headless: bool = True, max_pages_per_browser: int = 50):
+        self.headless = headless
+        self.max_pages_per_browser = max_pages_per_browser
+        self.launch_count = 0
+        self._stealth_cm = None
+        self._playwright = None
+        self._browsers: dict[str, _PooledBrowser] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    async def start(self):
+        """Starts the Playwright driver. Browsers are launched on demand."""
+        if self._playwright:
+            return
+        self._stealth_cm = Stealth().use_async(async_playwright())
+        self._playwright = await self._stealth_cm.__aenter__()
+
+    async def shutdown(self):
+        """Closes every pooled browser and stops the Playwright driver."""
+        for entry in list(self._browsers.values()):
+            await self._close_browser(entry)
+        self._browsers.clear()
+        if self._stealth_cm:
+            await self._stealth_cm.__aexit__(None, None, None)
+        self._stealth_cm = None
+        self._playwright = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.shutdown()
+
+    @staticmethod
+    def identity_for(proxy: dict | None) -> str:
+        """Returns the pool key for a Playwright proxy dict (or the local IP)."""
+        if not proxy:
+            return LOCAL_IDENTITY
+        return f"{proxy.get('username', '')}@{proxy['server']}"
+
+    @asynccontextmanager
+    async def context(self, proxy: dict | None = None, **context_options):
+        """
+        Yields a fresh BrowserContext on the browser for the given proxy.
+        The context is always closed on exit, and the browser is recycled
+        afterwards if it has reached its page budget.
+        """
+        entry = await self._acquire(proxy)
+        context: BrowserContext | None = None
+        try:
+            with metrics.timer("browser_context_seconds"):
+                context = await entry.browser.new_context(**context_options)
+            yield context
+        finally:
+            entry.active_contexts -= 1
+            if context:
+                try:
+                    await context.close()
+                except Exception:
+                    # The browser may already be gone; the health check below
+                    # takes care of replacing it.
+                    pass
+            if not entry.browser.is_connected():
+                entry.retired = True
+            if entry.retired and entry.active_contexts == 0:
+                await self._close_browser(entry)
+
+    async def _acquire(self, proxy: dict | None) -> _PooledBrowser:
+        if not self._playwright:
+            raise RuntimeError("BrowserPool.start() must be called before use.")
+
+        key = self.identity_for(proxy)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._browsers.get(key)
+            if entry and (entry.retired or not entry.browser.is_connected()):
+                # Detach the old browser; it is closed once its last context ends.
+                entry.retired = True
+                self._browsers.pop(key, None)
+                if entry.active_contexts == 0:
+                    await self._close_browser(entry)
+                entry = None
+
+            if entry is None:
+                launch_options = {"headless": self.headless}
+                if proxy:
+                    launch_options["proxy"] = proxy
+                with metrics.timer("browser_launch_seconds"):
+                    browser = await self._playwright.chromium.launch(**launch_options)
+                self.launch_count += 1
+                metrics.inc("browser_launches_total")
+                entry = _PooledBrowser(browser)
+                self._browsers[key] = entry
+
+            entry.pages_served += 1
+            entry.active_contexts += 1
+            if entry.pages_served >= self.max_pages_per_browser:
+                # Serve this last page, then hand the slot to a new browser.
+                entry.retired = True
+                self._browsers.pop(key, None)
+            return entry
+
+    async def _close_browser(self, entry: _PooledBrowser):
+        entry.retired = True
+        try:
+            await entry.browser.close()
+        except Exception:
+            pass
@@ -0,0 +1,429 @@
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+from .html_text import BLOCK_TAGS, SKIPPED_TAGS, normalize_text
+from .metrics import metrics
+
+# Where the posting lives on the major job boards, by domain suffix. A
+# selector is a tag, #id, .class or [attr=value] (or a combination), and
+# several can be given separated by commas.
+DOMAIN_SELECTORS = {
+    "indeed.com": "#jobDescriptionText",
+    "linkedin.com": ".show-more-less-html__markup, .description__text",
+    "adzuna.com": ".adp-body",
+    "greenhouse.io": "#content",
+    "lever.co": ".posting-page",
+    "workable.com": "[data-ui=job-description]",
+    "smartrecruiters.com": "[itemprop=description]",
+}
+
+# Elements that never hold the posting
+REMOVED_TAGS = {"nav", "aside", "footer", "header", "button", "select"}
+UNLIKELY = re.compile(
+    r"banner|breadcrumb|comment|cookie|consent|footer|gdpr|header|menu|modal|"
+    r"nav|newsletter|pager|pagination|popup|promo|related|share|sidebar|"
+    r"similar|social|sponsor|subscribe|recommend",
+    re.I,
+)
+MAYBE_CANDIDATE = re.compile(r"and|article|body|column|content|main|description", re.I)
+POSITIVE = re.compile(
+    r"article|body|content|description|detail|entry|job|main|post|text|vacanc", re.I
+)
+NEGATIVE = re.compile(
+    r"apply|comment|login|meta|related|share|sidebar|signup|social|sponsor|widget",
+    re.I,
+)
+PARAGRAPH_TAGS = {"p", "pre", "td", "li", "dd", "blockquote"}
+TAG_SCORES = {
+    "div": 5,
+    "article": 10,
+    "main": 10,
+    "pre": 3,
+    "td": 3,
+    "blockquote": 3,
+    "address": -3,
+    "ol": -3,
+    "ul": -3,
+    "dl": -3,
+    "dd": -3,
+    "dt": -3,
+    "li": -3,
+    "form": -3,
+    "h1": -5,
+    "h2": -5,
+    "h3": -5,
+    "h4": -5,
+    "h5": -5,
+    "h6": -5,
+    "th": -5,
+}
+VOID_TAGS = {
+    "area",
+    "base",
+    "br",
+    "col",
+    "embed",
+    "hr",
+    "img",
+    "input",
+    "link",
+    "meta",
+    "source",
+    "track",
+    "wbr",
+}
+# Tags a new sibling of the same kind closes, as browsers do
+IMPLICITLY_CLOSED = {"p", "li", "dt", "dd", "tr", "td", "th", "option"}
+MIN_PARAGRAPH_CHARS = 25
+# Less main content than this means the scoring picked the wrong element
+MIN_CONTENT_CHARS = 200
+SELECTOR_PART = re.compile(
+    r"(?P<tag>^[\w-]+)|#(?P<id>[\w-]+)|\.(?P<cls>[\w-]+)"
+    r"|\[(?P<attr>[\w-]+)=\"?(?P<value>[^\]\"]*)\"?\]"
+)
+
+
+class _Element:
+    __slots__ = ("tag", "attrs", "children", "parent", "score", "text_len", "link_len")
+
+    def __init__(self, tag: str, attrs: dict, parent: "_Element | None"):
+        self.tag = tag
+        self.attrs = attrs
+        self.children: list = []  # _Elements and text
+        self.parent = parent
+        self.score: float | None = None  # Set once it's a candidate
+        self.text_len = 0
+        self.link_len = 0
+
+    def class_and_id(self) -> str:
+        return f"{self.attrs.get('class') or ''} {self.attrs.get('id') or ''}"
+
+
+class _TreeBuilder(HTMLParser):
+    """Builds a lightweight element tree, without scripts, styles or <head>."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = _Element("#root", {}, None)
+        self._stack = [self.root]
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+        if self._skip_depth:
+            return
+        if tag in VOID_TAGS:
+            if tag in BLOCK_TAGS:
+                self._stack[-1].children.append("\n")
+            return
+        if tag in IMPLICITLY_CLOSED and self._stack[-1].tag == tag:
+            self._stack.pop()
+        element = _Element(tag, dict(attrs), self._stack[-1])
+        self._stack[-1].children.append(element)
+        self._stack.append(element)
+
+    def handle_startendtag(self, tag, attrs):
+        if not self._skip_depth and tag in BLOCK_TAGS:
+            self._stack[-1].children.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+            return
+        if self._skip_depth:
+            return
+        # Close the nearest open element with this tag, and anything left
+        # open inside it; stray end tags are ignored
+        for index in range(len(self._stack) - 1, 0, -1):
+            if self._stack[index].tag == tag:
+                del self._stack[index:]
+                break
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._stack[-1].children.append(data)
+
+
+def _iter_elements(root: _Element):
+    """Yields the elements under `root` (included) in document order."""
+    stack = [root]
+    while stack:
+        element = stack.pop()
+        yield element
+        stack.extend(
+            child for child in reversed(element.children) if type(child) is _Element
+        )
+
+
+def _render(elements: list[_Element]) -> str:
+    """Renders elements to text like `html_to_text` does."""
+    parts = []
+    stack = list(reversed(elements))
+    while stack:
+        node = stack.pop()
+        if type(node) is str:
+            parts.append(node)
+            continue
+        if node.tag in BLOCK_TAGS:
+            parts.append("\n")
+            stack.append("\n")
+        stack.extend(reversed(node.children))
+    return normalize_text("".join(parts))
+
+
+class _Selector:
+    """A tiny CSS selector: alternatives of tag, #id, .class and [attr=value]."""
+
+    def __init__(self, selector: str):
+        # Each alternative is a list of (attribute, value) conditions, where
+        # the attribute "#tag" stands for the element's tag
+        self.alternatives = []
+        for alternative in selector.split(","):
+            conditions = []
+            for match in SELECTOR_PART.finditer(alternative.strip()):
+                if match["tag"]:
+                    conditions.append(("#tag", match["tag"]))
+                elif match["id"]:
+                    conditions.append(("id", match["id"]))
+                elif match["cls"]:
+                    conditions.append(("class", match["cls"]))
+                else:
+                    conditions.append((match["attr"], match["value"]))
+            if conditions:
+                self.alternatives.append(conditions)
+
+    @staticmethod
+    def _matches(element: _Element, conditions: list[tuple[str, str]]) -> bool:
+        for attribute, value in conditions:
+            if attribute == "#tag":
+                if element.tag != value:
+                    return False
+            elif attribute == "class":
+                if value not in (element.attrs.get("class") or "").split():
+                    return False
+            elif element.attrs.get(attribute) != value:
+                return False
+        return True
+
+    def select(self, root: _Element) -> _Element | None:
+        """The first element matching an alternative, trying them in order."""
+        for conditions in self.alternatives:
+            for element in _iter_elements(root):
+                if self._matches(element, conditions):
+                    return element
+        return None
+
+
+@dataclass
+class ParsedPage:
+    root: _Element
+    text: str  # The whole page's text
+
+
+@dataclass
+class Extraction:
+    text: str  # The posting, capped at the extractor's max_chars
+    raw_text: str  # The whole page's text
+    method: str  # "selector", "density" or "fallback"
+
+
+class ContentExtractor:
+    """
+    Isolates the job posting from a page's HTML, dropping navigation,
+    cookie banners, related-job lists and footers.
+
+    Known job boards use a CSS selector from `DOMAIN_SELECTORS` (or
+    `selectors`, which extend and override it). Other pages are scored
+    readability-style: every paragraph scores by length and commas, the
+    score goes to its parent and half of it to its grandparent, class/id
+    names weigh in, and the best container (minus its link density) wins
+    along with its high-scoring siblings. When nothing scores well the
+    whole page minus its navigation-like elements is used. The result is
+    cut to `max_chars` (0 for no limit).
+
+    Raw and extracted sizes are totalled for the run summary.
+    """
+
+    def __init__(self, max_chars: int = 20000, selectors: dict | None = None):
+        self.max_chars = max_chars
+        self.selectors = {
+            domain: _Selector(selector)
+            for domain, selector in {**DOMAIN_SELECTORS, **(selectors or {})}.items()
+        }
+        self.methods = Counter()
+        self.raw_chars = 0
+        self.extracted_chars = 0
+
+    def _selector_for(self, url: str) -> _Selector | None:
+        host = (urlsplit(url).hostname or "").lower()
+        for domain, selector in self.selectors.items():
+            if host == domain or host.endswith(f".{domain}"):
+                return selector
+        return None
+
+    def parse(self, html: str) -> ParsedPage:
+        """
+        Parses a page, so its full text can be checked (e.g. for block
+        pages) before the posting is extracted with `extract_page`.
+        """
+        builder = _TreeBuilder()
+        builder.feed(html)
+        builder.close()
+        return ParsedPage(root=builder.root, text=_render([builder.root]))
+
+    def extract(self, html: str, url: str) -> Extraction:
+        """Returns the posting text and the raw page text."""
+        return self.extract_page(self.parse(html), url)
+
+    def extract_page(self, page: ParsedPage, url: str) -> Extraction:
+        """
+        Like `extract`, for a page from `parse`. `url` is where the page
+        was served from, which picks the selector. The page's tree is
+        changed, so a page can only be extracted once.
+        """
+        started = time.perf_counter()
+        root = page.root
+        raw_text = page.text
+
+        text, method = None, None
+        selector = self._selector_for(url)
+        if selector:
+            element = selector.select(root)
+            if element is not None:
+                text, method = _render([element]), "selector"
+        if not text:
+            _remove_unlikely(root)
+            elements = _best_elements(root)
+            if elements:
+                text = _render(elements)
+                method = "density"
+            if not text or len(text) < MIN_CONTENT_CHARS:
+                text, method = _render([root]), "fallback"
+
+        text = self._cap(text)
+        self.methods[method] += 1
+        self.raw_chars += len(raw_text)
+        self.extracted_chars += len(text)
+        metrics.inc("content_extractions_total", method=method)
+        metrics.inc("content_raw_chars_total", len(raw_text))
+        metrics.inc("content_extracted_chars_total", len(text))
+        metrics.observe("content_extraction_seconds", time.perf_counter() - started)
+        return Extraction(text=text, raw_text=raw_text, method=method)
+
+    def _cap(self, text: str) -> str:
+        if not self.max_chars or len(text) <= self.max_chars:
+            return text
+        # Cut at a line break if one is reasonably close to the limit
+        cut = text.rfind("\n", 0, self.max_chars)
+        return text[: cut if cut > self.max_chars // 2 else self.max_chars]
+
+    def summary(self) -> str:
+        ratio = self.raw_chars / self.extracted_chars if self.extracted_chars else 0.0
+        methods = ", ".join(
+            f"{count} by {name}" for name, count in self.methods.items()
+        )
+        return (
+            f"{self.raw_chars:,} page chars -> {self.extracted_chars:,} kept "
+            f"({ratio:.1f}x smaller; {methods or 'no pages'})"
+        )
+
+
+def _remove_unlikely(root: _Element):
+    """Detaches elements that are navigation, banners, footers and the like."""
+    stack = [root]
+    while stack:
+        element = stack.pop()
+        kept = []
+        for child in element.children:
+            if type(child) is _Element:
+                names = child.class_and_id()
+                if child.tag in REMOVED_TAGS or (
+                    child.tag not in ("body", "article", "main")
+                    and UNLIKELY.search(names)
+                    and not MAYBE_CANDIDATE.search(names)
+                ):
+                    continue
+                stack.append(child)
+            kept.append(child)
+        element.children = kept
+
+
+def _class_weight(element: _Element) -> int:
+    names = element.class_and_id()
+    weight = 0
+    if POSITIVE.search(names):
+        weight += 25
+    if NEGATIVE.search(names):
+        weight -= 25
+    return weight
+
+
+def _initialize(element: _Element):
+    if element.score is None:
+        element.score = TAG_SCORES.get(element.tag, 0) + _class_weight(element)
+
+
+def _best_elements(root: _Element) -> list[_Element]:
+    """The highest-scoring container and its related siblings."""
+    elements = list(_iter_elements(root))
+
+    # Text and link lengths, children before parents
+    for element in reversed(elements):
+        text_len = link_len = 0
+        for child in element.children:
+            if type(child) is str:
+                text_len += len(" ".join(child.split()))
+            else:
+                text_len += child.text_len
+                link_len += child.link_len
+        element.text_len = text_len
+        element.link_len = text_len if element.tag == "a" else link_len
+
+    candidates = []
+    for element in elements:
+        if element.tag not in PARAGRAPH_TAGS or element.text_len < MIN_PARAGRAPH_CHARS:
+            continue
+        parent = element.parent
+        if parent is None or parent is root:
+            continue
+        text = _render([element])
+        score = 1 + text.count(",") + min(len(text) / 100, 3)
+        for ancestor, share in ((parent, 1), (parent.parent, 0.5)):
+            if ancestor is None or ancestor is root:
+                break
+            if ancestor.score is None:
+                _initialize(ancestor)
+                candidates.append(ancestor)
+            ancestor.score += score * share
+
+    if not candidates:
+        return []
+    for candidate in candidates:
+        link_density = (
+            candidate.link_len / candidate.text_len if candidate.text_len else 1
+        )
+        candidate.score *= 1 - link_density
+    best = max(candidates, key=lambda candidate: candidate.score)
+    if best.parent is None or best.score <= 0:
+        return [best]
+
+    threshold = max(10, best.score * 0.2)
+    related = []
+    for sibling in best.parent.children:
+        if type(sibling) is not _Element:
+            continue
+        if sibling is best or (
+            sibling.score is not None and sibling.score >= threshold
+        ):
+            related.append(sibling)
+        elif (
+            sibling.tag == "p"
+            and sibling.text_len > 80
+            and sibling.link_len / sibling.text_len < 0.25
+        ):
+            related.append(sibling)
+    return related
@@ -1,28 +1,153 @@
 from abc import ABC, abstractmethod
+import dataclasses
+import logging
 import os
+import time
 from datetime import datetime
+from operator import attrgetter
+from typing import IO
 from models.job import Job
+from .metrics import metrics
+
+log = logging.getLogger(__name__)
+
+JOB_FIELDS = tuple(field.name for field in dataclasses.fields(Job))
+# Returns a job's field values as a tuple, in JOB_FIELDS order
+job_values = attrgetter(*JOB_FIELDS)
+WRITE_BUFFER_SIZE = 1024 * 1024  # Bytes held in memory between checkpoints
+
+
+def make_run_id(search_term: str) -> str:
+    """A new run id, which is also the base name of the run's output files."""
+    search_term_safe = search_term.replace(" ", "_")
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return f"{search_term_safe}_{timestamp}"
 
 
 class DataWriter(ABC):
     """
     Abstract base class for data writers. Defines the interface for writing job data.
+
+    Writers keep their output file open and buffer records in memory. The
+    buffer is flushed and fsynced (a checkpoint) every `flush_every` records
+    or once `flush_interval` seconds have passed since the last checkpoint,
+    whichever comes first, and always on close. Use a writer as a context
+    manager so it is closed even when the run fails.
+
+    Output files are named after the run id; pass an existing `run_id` to
+    append to that run's files instead of starting new ones.
     """
 
-    def __init__(self, search_term: str, output_dir: str = "data"):
-        search_term_safe = search_term.replace(" ", "_")
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # False for formats that can't be checkpointed (their file is only
+    # readable once closed); the run journal doesn't wait for them
+    checkpoints = True
+
+    def __init__(
+        self,
+        search_term: str,
+        output_dir: str = "data",
+        flush_every: int = 50,
+        flush_interval: float = 5.0,
+        run_id: str | None = None,
+    ):
+        self.run_id = run_id or make_run_id(search_term)
 
         # Ensure the output directory exists
         os.makedirs(output_dir, exist_ok=True)
 
         # Create a base filename without an extension
-        self.base_filename = os.path.join(output_dir, f"{search_term_safe}_{timestamp}")
+        self.base_filename = os.path.join(output_dir, self.run_id)
+        self.filename: str | None = None  # Set by subclasses
+
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._file: IO | None = None
+        self._pending = 0
+        self._last_checkpoint = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def pending_records(self) -> int:
+        """Records written since the last checkpoint."""
+        return self._pending
 
-    @abstractmethod
     def append_job(self, job: Job):
         """
-        Appends a single job record to the output file.
+        Appends a single job record to the output file. The file is opened
+        on the first record, so runs that save nothing create no file.
+        """
+        try:
+            if self._file is None:
+                self._file = self._open()
+            self._write_job(job)
+            self._pending += 1
+            if self._pending >= self.flush_every:
+                self.flush()
+            else:
+                self.flush_if_due()
+        except IOError as e:
+            log.error(f"Error writing to file {self.filename}: {e}")
+
+    def flush_if_due(self):
+        """
+        Checkpoints if records have been buffered for `flush_interval`
+        seconds. Called on every append, and by a timer so records don't
+        wait for the next append when jobs arrive slowly.
+        """
+        if (
+            self.checkpoints
+            and self._pending
+            and time.monotonic() - self._last_checkpoint >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self):
+        """Writes buffered records to disk and fsyncs the file (a checkpoint)."""
+        if self._file is None:
+            return
+        with metrics.timer("writer_flush_seconds", writer=type(self).__name__):
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_checkpoint = time.monotonic()
+
+    def close(self):
+        """Flushes any buffered records and closes the file."""
+        if self._file is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self._file.close()
+            self._file = None
+
+    def _open(self) -> IO:
+        """Opens the output file for appending. Subclasses may extend this."""
+        return open(
+            self.filename,
+            "a",
+            newline="",
+            encoding="utf-8",
+            buffering=WRITE_BUFFER_SIZE,
+        )
+
+    @staticmethod
+    def _job_record(job: Job) -> dict:
+        """
+        A flat dict of the job's fields. Unlike `dataclasses.asdict`, this
+        does not deep-copy the (potentially large) field values.
+        """
+        return dict(zip(JOB_FIELDS, job_values(job)))
+
+    @abstractmethod
+    def _write_job(self, job: Job):
+        """
+        Writes a single job record to the open file (`self._file`).
         This must be implemented by all subclasses.
         """
         pass
@@ -0,0 +1,147 @@
+import re
+import dataclasses
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from models.job import Job
+
+# Query parameters that only carry tracking/attribution data.
+TRACKING_PARAMS = {
+    "gclid",
+    "fbclid",
+    "msclkid",
+    "mc_cid",
+    "mc_eid",
+    "ref",
+    "referrer",
+    "src",
+    "source",
+    "trk",
+    "trackingid",
+    "refid",
+}
+TRACKING_PREFIXES = ("utm_",)
+# Tracking parameters specific to one host (matched by domain suffix).
+HOST_TRACKING_PARAMS = {
+    "adzuna.com": {"se", "v"},
+}
+
+LEGAL_SUFFIXES = re.compile(
+    r"\b(gmbh|ag|se|inc|llc|ltd|limited|corp|corporation|co|plc|bv|sa|sarl)\b\.?"
+)
+GENDER_MARKERS = re.compile(r"\((?:m|w|f|d|x|all|gn)(?:\s*/\s*(?:m|w|f|d|x))*\)")
+NON_WORD = re.compile(r"[^\w]+")
+
+
+def canonicalize_url(url: str | None) -> str | None:
+    """
+    Returns a canonical form of a job URL: lowercase scheme and host without
+    "www.", default ports and fragments dropped, no trailing slash, tracking
+    parameters removed and the remaining parameters sorted.
+    """
+    if not url:
+        return None
+
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "https"
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    netloc = host
+    if parts.port and not (
+        (scheme == "http" and parts.port == 80)
+        or (scheme == "https" and parts.port == 443)
+    ):
+        netloc = f"{host}:{parts.port}"
+
+    path = re.sub(r"/{2,}", "/", parts.path).rstrip("/") or "/"
+
+    host_params = set()
+    for domain, params in HOST_TRACKING_PARAMS.items():
+        if host == domain or host.endswith(f".{domain}"):
+            host_params |= params
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS
+        and key.lower() not in host_params
+        and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+
+    return urlunsplit((scheme, netloc, path, urlencode(query), ""))
+
+
+def _normalize_text(value: str) -> str:
+    return NON_WORD.sub(" ", value.lower()).strip()
+
+
+def job_fingerprint(job: Job) -> tuple[str, str, str] | None:
+    """
+    Returns a (title, company, location) key that identifies the same posting
+    across sources, or None if any of the three fields is missing.
+    """
+    if not (job.title and job.company_name and job.location):
+        return None
+
+    title = _normalize_text(GENDER_MARKERS.sub(" ", job.title.lower()))
+    company = _normalize_text(LEGAL_SUFFIXES.sub(" ", job.company_name.lower()))
+    # "Berlin, Germany" and "Berlin" describe the same place for our purposes.
+    location = _normalize_text(job.location.split(",")[0])
+    if not (title and company and location):
+        return None
+    return title, company, location
+
+
+def job_key(job: Job) -> str:
+    """Identifies a job by canonical URL, or by title/company/location."""
+    url = canonicalize_url(job.url)
+    if url:
+        return url
+    return "|".join(job_fingerprint(job) or (job.title or "", "", ""))
+
+
+class JobDeduplicator:
+    """
+    Keeps one Job per canonical URL and per (title, company, location)
+    fingerprint. Fields missing on the kept job are filled in from its
+    duplicates.
+    """
+
+    def __init__(self):
+        self._by_url: dict[str, Job] = {}
+        self._by_fingerprint: dict[tuple[str, str, str], Job] = {}
+        self.duplicate_count = 0
+
+    def add(self, job: Job) -> bool:
+        """
+        Registers a job. Returns True if it is new, or False if it duplicates
+        a job seen earlier (which is updated in place with any missing fields).
+        """
+        url_key = canonicalize_url(job.url)
+        fingerprint = job_fingerprint(job)
+
+        existing = (url_key and self._by_url.get(url_key)) or (
+            fingerprint and self._by_fingerprint.get(fingerprint)
+        )
+        if existing:
+            self._merge(existing, job)
+            self.duplicate_count += 1
+            # Remember the duplicate's keys too, so later copies under either
+            # URL or fingerprint still resolve to the kept job.
+            if url_key:
+                self._by_url.setdefault(url_key, existing)
+            if fingerprint:
+                self._by_fingerprint.setdefault(fingerprint, existing)
+            return False
+
+        if url_key:
+            self._by_url[url_key] = job
+        if fingerprint:
+            self._by_fingerprint[fingerprint] = job
+        return True
+
+    @staticmethod
+    def _merge(kept: Job, duplicate: Job):
+        for field in dataclasses.fields(Job):
+            if getattr(kept, field.name) in (None, "") and getattr(
+                duplicate, field.name
+            ) not in (None, ""):
+                setattr(kept, field.name, getattr(duplicate, field.name))
@@ -0,0 +1,88 @@
+import json
+import os
+import time
+from .file_lock import locked
+
+STRATEGY_FILE = "data/scrape_strategies.json"
+
+# Skip the HTTP fast path for a host once it has failed this many times...
+MIN_FAILURES_FOR_BROWSER = 3
+# ...while succeeding on less than this share of attempts.
+MIN_HTTP_SUCCESS_RATE = 0.2
+
+
+class DomainStrategy:
+    """
+    Remembers, per host, whether the plain-HTTP fast path works, so hosts
+    that always need a real browser go straight to Playwright. Also
+    remembers hosts that redirect to other sites (tracking links such as
+    Adzuna's), so their links can be resolved first and every per-site
+    decision is made for the site a job actually lives on.
+
+    Outcomes are persisted to `data/scrape_strategies.json`, so later runs
+    start with what earlier ones learned. Saving adds this process's new
+    outcomes to the file as it is then, so scrape workers that share it
+    don't overwrite each other's.
+    """
+
+    def __init__(self, path: str = STRATEGY_FILE):
+        self.path = path
+        self._hosts: dict[str, dict] = {}
+        # Outcomes recorded since the last save, per host
+        self._changes: dict[str, dict] = {}
+        self._load()
+
+    def _load(self):
+        self._hosts = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    self._hosts = json.load(f).get("hosts", {})
+            except (OSError, ValueError):
+                self._hosts = {}
+
+    def save(self):
+        """Merges the new outcomes into the file on disk, atomically."""
+        if not self._changes:
+            return
+        with locked(self.path):
+            self._load()
+            for host, change in self._changes.items():
+                stats = self._stats(host)
+                stats["http_ok"] += change["http_ok"]
+                stats["http_fail"] += change["http_fail"]
+                if change.get("redirects"):
+                    stats["redirects"] = True
+            # Per process, as scrape worker processes all save the same file
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"timestamp": time.time(), "hosts": self._hosts}, f)
+            os.replace(tmp_path, self.path)
+        self._changes.clear()
+
+    def prefers_browser(self, host: str) -> bool:
+        """True if the HTTP fast path has proven not to work for this host."""
+        stats = self._hosts.get(host)
+        if not stats or stats["http_fail"] < MIN_FAILURES_FOR_BROWSER:
+            return False
+        attempts = stats["http_ok"] + stats["http_fail"]
+        return stats["http_ok"] / attempts < MIN_HTTP_SUCCESS_RATE
+
+    def _stats(self, host: str) -> dict:
+        return self._hosts.setdefault(host, {"http_ok": 0, "http_fail": 0})
+
+    def _change(self, host: str) -> dict:
+        return self._changes.setdefault(host, {"http_ok": 0, "http_fail": 0})
+
+    def record(self, host: str, http_ok: bool):
+        key = "http_ok" if http_ok else "http_fail"
+        self._stats(host)[key] += 1
+        self._change(host)[key] += 1
+
+    def redirects(self, host: str) -> bool:
+        """True if links to this host have redirected to another host."""
+        return self._hosts.get(host, {}).get("redirects", False)
+
+    def record_redirect(self, host: str):
+        self._stats(host)["redirects"] = True
+        self._change(host)["redirects"] = True
@@ -0,0 +1,26 @@
+import contextlib
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+@contextlib.contextmanager
+def locked(path: str):
+    """
+    Holds an exclusive lock on `<path>.lock`, so processes that read, merge
+    and rewrite the same file (e.g. scrape workers saving what they learned)
+    don't overwrite each other's changes. Doesn't lock where `fcntl` is
+    missing (Windows).
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.lock", "a") as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,89 @@
+import re
+from html.parser import HTMLParser
+
+# Elements whose content is never part of the visible page text.
+SKIPPED_TAGS = {"script", "style", "noscript", "template", "svg", "head", "iframe"}
+# Elements that start a new line in rendered text.
+BLOCK_TAGS = {
+    "address",
+    "article",
+    "aside",
+    "blockquote",
+    "br",
+    "dd",
+    "div",
+    "dl",
+    "dt",
+    "fieldset",
+    "figcaption",
+    "figure",
+    "footer",
+    "form",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "header",
+    "hr",
+    "li",
+    "main",
+    "nav",
+    "ol",
+    "p",
+    "pre",
+    "section",
+    "table",
+    "td",
+    "th",
+    "tr",
+    "ul",
+}
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+
+def html_to_text(html: str) -> str:
+    """
+    Converts an HTML document to plain text roughly the way a browser's
+    `innerText` would: scripts, styles and <head> are dropped, block elements
+    become line breaks and runs of whitespace are collapsed.
+    """
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    return normalize_text("".join(parser.parts))
+
+
+def normalize_text(text: str) -> str:
+    """Collapses whitespace within lines and drops empty lines."""
+    lines = (
+        re.sub(r"[ \t\r\f\v\xa0]+", " ", line).strip() for line in text.split("\n")
+    )
+    return "\n".join(line for line in lines if line)
@@ -0,0 +1,44 @@
+import logging
+import httpx
+from .api_cache import CachingTransport, ResponseCache
+
+# httpx logs every request at INFO; keep it out of the run output.
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+DEFAULT_TIMEOUT = 20.0
+MAX_CONNECTIONS = 20
+MAX_KEEPALIVE_CONNECTIONS = 10
+
+
+def create_http_session(
+    timeout: float = DEFAULT_TIMEOUT,
+    max_connections: int = MAX_CONNECTIONS,
+    cache: ResponseCache | None = None,
+    offline: bool = False,
+    **kwargs,
+) -> httpx.AsyncClient:
+    """
+    Creates the shared, connection-pooled async HTTP session used by the API
+    clients. Reusing one session keeps TCP/TLS connections alive across pages
+    and clients instead of handshaking for every request.
+
+    With a `cache`, GET responses are served from and stored in it (see
+    `CachingTransport`); `offline` then never touches the network.
+    """
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+    )
+    if cache is not None:
+        # A custom transport replaces the default one, so it gets the limits
+        kwargs["transport"] = CachingTransport(
+            cache,
+            kwargs.pop("transport", None) or httpx.AsyncHTTPTransport(limits=limits),
+            offline=offline,
+        )
+    return httpx.AsyncClient(
+        timeout=timeout,
+        limits=limits,
+        follow_redirects=True,
+        **kwargs,
+    )
@@ -1,20 +1,122 @@
+import asyncio
+import logging
+import time
+from typing import AsyncIterator
 from models.job import Job
-from models.job_client import JobClient
+from models.job_client import JobClient, LastPage
+from models.watermark import Watermark
+from .dedup import JobDeduplicator
+from .metrics import metrics
+from .watermarks import WatermarkStore, query_key
+
+log = logging.getLogger(__name__)
 
 
 class JobSearch:
-    def __init__(self, clients: list[JobClient]):
+    def __init__(
+        self,
+        clients: list[JobClient],
+        page_buffer: int = 4,
+        deduplicator: JobDeduplicator | None = None,
+        watermarks: WatermarkStore | None = None,
+    ):
+        """
+        :param deduplicator: If given, jobs it has already seen (across
+            clients, and across searches sharing it) are skipped.
+        :param watermarks: If given, searches are incremental: each client
+            only returns jobs that are new since the query's last committed
+            run, and the jobs handed out are observed for the next commit.
+        """
         self.clients = clients
+        self.page_buffer = page_buffer
+        self.deduplicator = deduplicator
+        self.watermarks = watermarks
+
+    async def stream(
+        self, what, where, remote_only: bool = False, limit: int = 0
+    ) -> AsyncIterator[Job]:
+        """
+        Yields jobs from all clients as each API page arrives.
+
+        Clients are queried concurrently and feed a bounded page buffer, so
+        fetching pauses while the consumer is busy. Duplicates are dropped
+        before they count towards `limit`. Once `limit` jobs (if non-zero)
+        have been yielded, the remaining fetches are cancelled.
+
+        :param what: The job title/keyword to search for.
+        :param where: The location to search in.
+        :param remote_only: If True, filters for remote jobs only.
+        :param limit: Stop after this many jobs. 0 means no limit.
+        """
+        pages: asyncio.Queue = asyncio.Queue(maxsize=self.page_buffer)
+        client_done = object()
+        key = query_key(what, where, remote_only)
+
+        # Page timings are how long the search waited for each of a
+        # client's pages, so they exclude time spent blocked on the buffer
+        async def pump(client: JobClient):
+            name = type(client).__name__
+            # Incremental searches always page newest first, so even the
+            # first one can record the range of postings it covered
+            since = (
+                (self.watermarks.get(key, name) or Watermark())
+                if self.watermarks
+                else None
+            )
+            try:
+                started = time.perf_counter()
+                async for jobs in client.iter_pages(
+                    what, where, remote_only=remote_only, since=since
+                ):
+                    metrics.observe(
+                        "api_page_fetch_seconds",
+                        time.perf_counter() - started,
+                        client=name,
+                    )
+                    metrics.inc("api_pages_total", client=name)
+                    metrics.inc("api_jobs_total", len(jobs), client=name)
+                    await pages.put((name, jobs))
+                    started = time.perf_counter()
+            except Exception as e:
+                log.error(f"An error occurred with {type(client).__name__}: {e}")
+            await pages.put(client_done)
+
+        tasks = [asyncio.create_task(pump(client)) for client in self.clients]
+        remaining = len(tasks)
+        yielded = 0
+        try:
+            while remaining:
+                page = await pages.get()
+                if page is client_done:
+                    remaining -= 1
+                    continue
+                name, jobs = page
+                for job in jobs:
+                    # Duplicates count as handled too; another job covers them
+                    if self.watermarks:
+                        self.watermarks.observe(key, name, job)
+                    if self.deduplicator and not self.deduplicator.add(job):
+                        continue
+                    yield job
+                    yielded += 1
+                    if limit and yielded >= limit:
+                        return
+                # The client's closing LastPage says how far down its listing
+                # the jobs handed out go (unless --limit stopped the search
+                # before it)
+                if self.watermarks and isinstance(jobs, LastPage):
+                    self.watermarks.mark_covered(key, name, jobs.oldest_posted_at)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
 
-    def search(self, what, where, remote_only: bool = False) -> list[Job]:
+    async def search(self, what, where, remote_only: bool = False) -> list[Job]:
         """
-        Searches for jobs across all clients.
+        Searches for jobs across all clients concurrently.
 
         :param what: The job title/keyword to search for.
         :param where: The location to search in.
         :param remote_only: If True, filters for remote jobs only.
         """
-        all_jobs = []
-        for client in self.clients:
-            all_jobs.extend(client.get_jobs(what, where, remote_only=remote_only))
-        return all_jobs
+        return [job async for job in self.stream(what, where, remote_only=remote_only)]
@@ -1,5 +1,4 @@
 import json
-import dataclasses
 from models.job import Job
 from .data_writer import DataWriter
 
@@ -9,19 +8,9 @@ class JSONLWriter(DataWriter):
     A writer that appends job data to a JSONL file, one job at a time.
     """
 
-    def __init__(self, search_term: str, output_dir: str = "data"):
-        super().__init__(search_term, output_dir)
+    def __init__(self, search_term: str, output_dir: str = "data", **kwargs):
+        super().__init__(search_term, output_dir, **kwargs)
         self.filename = f"{self.base_filename}.jsonl"
 
-    def append_job(self, job: Job):
-        try:
-            # Convert the Job dataclass object to a dictionary
-            job_dict = dataclasses.asdict(job)
-
-            # Convert the dictionary to a JSON string
-            json_string = json.dumps(job_dict)
-
-            with open(self.filename, "a", encoding="utf-8") as f:
-                f.write(json_string + "\n")
-        except IOError as e:
-            print(f"Error writing to JSONL file {self.filename}: {e}")
+    def _write_job(self, job: Job):
+        self._file.write(json.dumps(self._job_record(job)) + "\n")
@@ -0,0 +1,165 @@
+import asyncio
+import hashlib
+import multiprocessing
+import re
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from langdetect import DetectorFactory, LangDetectException, detect
+from .metrics import metrics
+
+URL_REGEX = re.compile(r"https?://\S+|www\.\S+")
+EMAIL_REGEX = re.compile(r"[\w\.\-]+@[\w\.\-]+\.[\w]+")
+# Lines with fewer words than this are usually navigation, buttons or footers
+MIN_WORDS_PER_LINE = 6
+
+
+def clean_sample(text: str, max_chars: int) -> str:
+    """
+    Returns a bounded sample of a page's prose for language detection: URLs
+    and emails removed, short menu/footer-style lines dropped, and the
+    result cut to `max_chars`. Falls back to the raw text if no line
+    qualifies.
+    """
+    text = EMAIL_REGEX.sub(" ", URL_REGEX.sub(" ", text))
+    prose = []
+    length = 0
+    for line in text.splitlines():
+        line = line.strip()
+        if len(line.split()) < MIN_WORDS_PER_LINE:
+            continue
+        prose.append(line)
+        length += len(line) + 1
+        if length >= max_chars:
+            break
+    sample = "\n".join(prose) if prose else text
+    return sample[:max_chars]
+
+
+def _pool_context():
+    # Forked workers would inherit the Playwright driver's pipes and keep the
+    # driver alive at shutdown, so start them from a clean forkserver instead.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context()
+
+
+def _init_worker(seed: int):
+    # langdetect is randomized; a fixed seed makes results reproducible.
+    DetectorFactory.seed = seed
+
+
+def _detect_language(sample: str) -> str | None:
+    try:
+        return detect(sample)
+    except LangDetectException:
+        return None
+
+
+class LanguageFilter:
+    """
+    Detects the language of job descriptions in a pool of worker processes,
+    so the CPU-heavy detection never blocks the event loop.
+
+    Detection runs on a cleaned, bounded sample of each description and is
+    memoized by the sample's hash, so reposted descriptions are classified
+    only once per run. The memo keeps the `memo_size` most recently used
+    results.
+    """
+
+    def __init__(
+        self,
+        target_lang: str,
+        max_workers: int | None = None,
+        sample_chars: int = 2000,
+        seed: int = 0,
+        memo_size: int = 10_000,
+    ):
+        self.target_lang = target_lang
+        self.sample_chars = sample_chars
+        self.memo_size = memo_size
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=_pool_context(),
+            initializer=_init_worker,
+            initargs=(seed,),
+        )
+        self._memo: OrderedDict[str, str | None] = OrderedDict()
+        # Detections still running, so concurrent repeats wait for them
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self.detections = 0
+        self.memo_hits = 0
+        self.total_latency = 0.0
+        self._first_started: float | None = None
+        self._last_finished: float | None = None
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+
+    async def detect(self, text: str) -> str | None:
+        """Returns the detected language code, or None if it can't be detected."""
+        sample = clean_sample(text, self.sample_chars)
+        key = hashlib.sha1(sample.encode("utf-8")).hexdigest()
+
+        if key in self._memo:
+            self._memo.move_to_end(key)
+            self.memo_hits += 1
+            metrics.inc("language_memo_hits_total")
+            return self._memo[key]
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self.memo_hits += 1
+            metrics.inc("language_memo_hits_total")
+            return await asyncio.shield(pending)
+
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        if self._first_started is None:
+            self._first_started = started
+        pending = loop.run_in_executor(self._executor, _detect_language, sample)
+        self._in_flight[key] = pending
+        try:
+            # Failures (e.g. a crashed worker process) are not memoized
+            language = await asyncio.shield(pending)
+        finally:
+            self._in_flight.pop(key, None)
+        self._memo[key] = language
+        if len(self._memo) > self.memo_size:
+            self._memo.popitem(last=False)
+        finished = time.monotonic()
+        self.detections += 1
+        self.total_latency += finished - started
+        metrics.observe("language_detection_seconds", finished - started)
+        self._last_finished = finished
+        return language
+
+    async def matches(
+        self, text: str, target_lang: str | None = None
+    ) -> tuple[bool, str | None]:
+        """
+        Returns (is_target_language, detected_language). `target_lang`
+        overrides the filter's own target, e.g. for one query of a batch.
+        """
+        language = await self.detect(text)
+        return language == (target_lang or self.target_lang), language
+
+    def summary(self) -> str:
+        elapsed = (
+            self._last_finished - self._first_started
+            if self._first_started is not None and self._last_finished is not None
+            else 0.0
+        )
+        throughput = self.detections / elapsed if elapsed > 0 else 0.0
+        average_ms = (
+            self.total_latency / self.detections * 1000 if self.detections else 0.0
+        )
+        return (
+            f"{self.detections} detections ({self.memo_hits} memoized), "
+            f"{throughput:.1f}/s, avg latency {average_ms:.0f} ms"
+        )
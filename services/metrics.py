@@ -0,0 +1,210 @@
+import bisect
+import json
+import os
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Upper bounds of the attempts-per-job histogram buckets
+ATTEMPT_BUCKETS = (1, 2, 3, 4, 5)
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: tuple) -> str:
+    if not key:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in key)
+    return f"{{{pairs}}}"
+
+
+class _Histogram:
+    """Prometheus-style histogram: cumulative bucket counts, sum and count."""
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates a quantile as the upper bound of the bucket it falls in
+        (the observed maximum for the +Inf bucket).
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "max": round(self.max, 6),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+        }
+
+
+class Metrics:
+    """
+    In-process counters and histograms for one run.
+
+    Metrics are identified by name plus optional labels, e.g.
+    `metrics.inc("api_pages_total", client="AdzunaClient")`. At the end of a
+    run the registry is exported as a JSON summary, and optionally as a
+    Prometheus text file for node_exporter's textfile collector.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self._counters: dict[str, dict[tuple, float]] = {}
+        self._histograms: dict[str, dict[tuple, _Histogram]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        series = self._counters.setdefault(name, {})
+        key = _label_key(labels)
+        series[key] = series.get(key, 0) + value
+
+    def observe(
+        self, name: str, value: float, buckets: tuple = LATENCY_BUCKETS, **labels
+    ):
+        series = self._histograms.setdefault(name, {})
+        key = _label_key(labels)
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = _Histogram(buckets)
+        histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Observes the time spent in the block, in seconds (even if it raises)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def export_state(self) -> dict:
+        """
+        Every series' raw values, JSON-serializable, for `merge_state` in
+        another process.
+        """
+        return {
+            "counters": [
+                [name, key, value]
+                for name, series in self._counters.items()
+                for key, value in series.items()
+            ],
+            "histograms": [
+                [name, key, h.buckets, h.counts, h.sum, h.count, h.max]
+                for name, series in self._histograms.items()
+                for key, h in series.items()
+            ],
+        }
+
+    def merge_state(self, state: dict):
+        """Adds the series exported by another process's `export_state`."""
+        for name, key, value in state["counters"]:
+            series = self._counters.setdefault(name, {})
+            key = tuple(map(tuple, key))
+            series[key] = series.get(key, 0) + value
+        for name, key, buckets, counts, total, count, maximum in state["histograms"]:
+            series = self._histograms.setdefault(name, {})
+            key = tuple(map(tuple, key))
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(tuple(buckets))
+            histogram.counts = [a + b for a, b in zip(histogram.counts, counts)]
+            histogram.sum += total
+            histogram.count += count
+            histogram.max = max(histogram.max, maximum)
+
+    def to_dict(self) -> dict:
+        """A JSON-serializable summary of every metric."""
+
+        def series_name(key: tuple) -> str:
+            return ",".join(f"{name}={value}" for name, value in key) or "total"
+
+        return {
+            "started": self.started,
+            "duration_s": round(time.time() - self.started, 3),
+            "counters": {
+                name: {series_name(key): value for key, value in series.items()}
+                for name, series in sorted(self._counters.items())
+            },
+            "histograms": {
+                name: {
+                    series_name(key): histogram.summary()
+                    for key, histogram in series.items()
+                }
+                for name, series in sorted(self._histograms.items())
+            },
+        }
+
+    def to_prometheus(self, prefix: str = "hunter_") -> str:
+        """Renders every metric in the Prometheus text exposition format."""
+        lines = []
+        for name, series in sorted(self._counters.items()):
+            full_name = f"{prefix}{name}"
+            lines.append(f"# TYPE {full_name} counter")
+            for key, value in series.items():
+                lines.append(f"{full_name}{_format_labels(key)} {value}")
+        for name, series in sorted(self._histograms.items()):
+            full_name = f"{prefix}{name}"
+            lines.append(f"# TYPE {full_name} histogram")
+            for key, histogram in series.items():
+                cumulative = 0
+                bounds = [*map(str, histogram.buckets), "+Inf"]
+                for bound, count in zip(bounds, histogram.counts):
+                    cumulative += count
+                    bucket_key = (*key, ("le", bound))
+                    lines.append(
+                        f"{full_name}_bucket{_format_labels(bucket_key)} {cumulative}"
+                    )
+                lines.append(f"{full_name}_sum{_format_labels(key)} {histogram.sum}")
+                lines.append(
+                    f"{full_name}_count{_format_labels(key)} {histogram.count}"
+                )
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path: str):
+        _write_atomic(path, json.dumps(self.to_dict(), indent=2))
+
+    def write_prometheus(self, path: str):
+        # The textfile collector may read at any time, so never expose a
+        # half-written file
+        _write_atomic(path, self.to_prometheus())
+
+
+def _write_atomic(path: str, text: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+# The registry shared by the whole pipeline, like a module-level logger
+metrics = Metrics()
@@ -0,0 +1,239 @@
+import hashlib
+import os
+import re
+import sqlite3
+import time
+from array import array
+from models.job import Job
+from .dedup import job_key
+from .metrics import metrics
+
+NEAR_DUPLICATE_DB = "data/near_duplicates.sqlite3"
+
+WORD = re.compile(r"\w+")
+SHINGLE_WORDS = 4  # Descriptions are compared as sets of 4-word sequences
+HASH_BITS = 64
+# Offset between densified bins, so a borrowed value never equals the original
+DENSIFY_STEP = 0x9E3779B97F4A7C15
+
+
+def _shingle_hashes(text: str) -> set[int]:
+    words = WORD.findall(text.lower())
+    if not words:
+        return set()
+    if len(words) <= SHINGLE_WORDS:
+        shingles = [" ".join(words)]
+    else:
+        shingles = (
+            " ".join(words[i : i + SHINGLE_WORDS])
+            for i in range(len(words) - SHINGLE_WORDS + 1)
+        )
+    return {
+        int.from_bytes(
+            hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big"
+        )
+        for shingle in shingles
+    }
+
+
+def minhash(text: str, num_bins: int) -> list[int] | None:
+    """
+    A MinHash signature of the text's word shingles, computed with
+    one-permutation hashing: each shingle is hashed once, the hash picks one
+    of `num_bins` bins and each bin keeps its minimum. Empty bins borrow
+    from the next non-empty one (densification), so signatures of similar
+    texts agree in about as many bins as their Jaccard similarity. Returns
+    None for text without words.
+    """
+    hashes = _shingle_hashes(text)
+    if not hashes:
+        return None
+    empty = 1 << HASH_BITS
+    mins = [empty] * num_bins
+    for value in hashes:
+        index = value % num_bins
+        if value < mins[index]:
+            mins[index] = value
+    if empty in mins:
+        original = mins[:]
+        for i in range(num_bins):
+            if original[i] == empty:
+                distance = 1
+                while original[(i + distance) % num_bins] == empty:
+                    distance += 1
+                source = original[(i + distance) % num_bins]
+                mins[i] = (source + distance * DENSIFY_STEP) % empty
+    return mins
+
+
+def _lsh_threshold(shape: tuple[int, int]) -> float:
+    bands, rows = shape
+    return (1 / bands) ** (1 / rows)
+
+
+def band_shape(num_bins: int, threshold: float) -> tuple[int, int]:
+    """
+    (bands, rows) for LSH banding: the shape whose candidate threshold
+    (1/bands)^(1/rows) is the highest one safely below `threshold`, so
+    postings at the threshold almost always share a band. Candidates are
+    then checked against the threshold exactly.
+    """
+    shapes = [
+        (bands, num_bins // bands)
+        for bands in range(1, num_bins + 1)
+        if num_bins % bands == 0
+    ]
+    below = [shape for shape in shapes if _lsh_threshold(shape) <= threshold * 0.9]
+    return max(below or shapes[-1:], key=_lsh_threshold)
+
+
+def similarity(a: list[int], b: list[int]) -> float:
+    """The share of bins two signatures agree in (estimated Jaccard)."""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+class NearDuplicateIndex:
+    """
+    A persistent index of scraped descriptions for finding reposts of the
+    same job under other URLs or companies (agencies, aggregators).
+
+    Each description's MinHash signature is stored in SQLite and split into
+    LSH bands; every band is an indexed bucket row. A lookup only fetches
+    the postings sharing a bucket with the new one and compares their
+    signatures, so it stays fast however many postings the index holds.
+    Postings older than `max_age` seconds are dropped when the index opens.
+    """
+
+    def __init__(
+        self,
+        path: str = NEAR_DUPLICATE_DB,
+        threshold: float = 0.9,
+        num_bins: int = 128,
+        max_age: float = 60 * 24 * 3600,
+    ):
+        self.path = path
+        self.threshold = threshold
+        self.num_bins = num_bins
+        self.bands, self.rows = band_shape(num_bins, threshold)
+        self.max_age = max_age
+        self.duplicates = 0
+        self.checked = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS postings (
+                id INTEGER PRIMARY KEY,
+                key TEXT NOT NULL UNIQUE,
+                num_bins INTEGER NOT NULL,
+                signature BLOB NOT NULL,
+                added_at REAL NOT NULL
+            )
+            """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS buckets (
+                bucket INTEGER NOT NULL,
+                posting_id INTEGER NOT NULL,
+                PRIMARY KEY (bucket, posting_id)
+            ) WITHOUT ROWID
+            """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_postings_added ON postings (added_at)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_buckets_posting ON buckets (posting_id)"
+        )
+        self._conn.commit()
+        self.evict()
+
+    def _buckets(self, signature: list[int]) -> list[int]:
+        """One bucket id per band, also keyed by the band shape."""
+        buckets = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows : (band + 1) * self.rows]
+            digest = hashlib.blake2b(
+                array("Q", rows).tobytes(),
+                digest_size=8,
+                person=f"{band}/{self.bands}x{self.rows}".encode("ascii")[:16],
+            ).digest()
+            buckets.append(int.from_bytes(digest, "big", signed=True))
+        return buckets
+
+    def check(self, job: Job) -> str | None:
+        """
+        Looks up the job's description and adds it to the index. Returns the
+        key (canonical URL) of an earlier posting it nearly duplicates, or
+        None if it is new. The job's own earlier copies (same URL) don't
+        count, so rescraping a posting never flags it.
+        """
+        if not job.job_description:
+            return None
+        signature = minhash(job.job_description, self.num_bins)
+        if signature is None:
+            return None
+        key = job_key(job)
+        buckets = self._buckets(signature)
+        self.checked += 1
+
+        with metrics.timer("near_duplicate_lookup_seconds"):
+            placeholders = ", ".join("?" * len(buckets))
+            rows = self._conn.execute(
+                "SELECT key, signature FROM postings WHERE num_bins = ? AND id IN"
+                f" (SELECT posting_id FROM buckets WHERE bucket IN ({placeholders}))",
+                (self.num_bins, *buckets),
+            ).fetchall()
+        best_key, best_similarity = None, 0.0
+        for other_key, blob in rows:
+            if other_key == key:
+                continue
+            score = similarity(signature, array("Q", blob).tolist())
+            if score >= self.threshold and score > best_similarity:
+                best_key, best_similarity = other_key, score
+
+        if best_key is None:
+            self._add(key, signature, buckets)
+            metrics.inc("near_duplicates_total", outcome="new")
+            return None
+        self.duplicates += 1
+        metrics.inc("near_duplicates_total", outcome="duplicate")
+        return best_key
+
+    def _add(self, key: str, signature: list[int], buckets: list[int]):
+        self._conn.execute(
+            "INSERT INTO postings (key, num_bins, signature, added_at)"
+            " VALUES (?, ?, ?, ?)"
+            " ON CONFLICT (key) DO UPDATE SET"
+            " num_bins = excluded.num_bins, signature = excluded.signature,"
+            " added_at = excluded.added_at",
+            (key, self.num_bins, array("Q", signature).tobytes(), time.time()),
+        )
+        (posting_id,) = self._conn.execute(
+            "SELECT id FROM postings WHERE key = ?", (key,)
+        ).fetchone()
+        self._conn.execute("DELETE FROM buckets WHERE posting_id = ?", (posting_id,))
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO buckets (bucket, posting_id) VALUES (?, ?)",
+            [(bucket, posting_id) for bucket in buckets],
+        )
+        self._conn.commit()
+
+    def evict(self):
+        """Drops postings older than `max_age`."""
+        cutoff = time.time() - self.max_age
+        self._conn.execute(
+            "DELETE FROM buckets WHERE posting_id IN"
+            " (SELECT id FROM postings WHERE added_at < ?)",
+            (cutoff,),
+        )
+        self._conn.execute("DELETE FROM postings WHERE added_at < ?", (cutoff,))
+        self._conn.commit()
+
+    def summary(self) -> str:
+        return (
+            f"{self.duplicates} of {self.checked} descriptions "
+            f"(threshold {self.threshold:.2f})"
+        )
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,120 @@
+import dataclasses
+import os
+import typing
+from models.job import Job
+from .data_writer import DataWriter, JOB_FIELDS, job_values
+from .metrics import metrics
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional
+    pa = None
+    pq = None
+
+# Low-cardinality columns that compress best with dictionary encoding
+DICTIONARY_COLUMNS = ["company_name", "location"]
+
+
+def job_schema() -> "pa.Schema":
+    """Builds the Arrow schema from the Job dataclass fields."""
+    type_map = {str: pa.string(), int: pa.int64(), float: pa.float64()}
+    hints = typing.get_type_hints(Job)
+    fields = []
+    for field in dataclasses.fields(Job):
+        hint = hints[field.name]
+        # Unwrap Optional[X] / X | None
+        args = [arg for arg in typing.get_args(hint) if arg is not type(None)]
+        base_type = args[0] if args else hint
+        fields.append(pa.field(field.name, type_map[base_type], nullable=True))
+    return pa.schema(fields)
+
+
+class ParquetWriter(DataWriter):
+    """
+    A writer that stores job data in a zstd-compressed Parquet file.
+
+    Records are buffered column by column and written as one row group per
+    `row_group_size` jobs, or sooner once the buffered descriptions reach
+    `max_buffer_bytes`, plus a final row group on close. A Parquet file is
+    only readable once it has been closed, so unlike the CSV/JSONL writers
+    a hard crash loses the file; a normal error, Ctrl-C or SIGTERM still
+    closes it. There are no checkpoints, so the run journal doesn't wait
+    for Parquet rows, and after a crash `--resume` doesn't write the lost
+    rows again (only CSV/JSONL output, if any, still has them).
+    For the same reason a resumed run can't append to the file, and writes
+    its records to the next free `<run-id>.partN.parquet` instead.
+    Requires the optional `pyarrow` package.
+    """
+
+    checkpoints = False
+
+    def __init__(
+        self,
+        search_term: str,
+        output_dir: str = "data",
+        row_group_size: int = 1000,
+        max_buffer_bytes: int = 64 * 1024 * 1024,
+        **kwargs,
+    ):
+        if pa is None:
+            raise ImportError(
+                "Parquet output requires pyarrow. Install it with 'pip install pyarrow'."
+            )
+        kwargs.setdefault("flush_every", row_group_size)
+        super().__init__(search_term, output_dir, **kwargs)
+        self.filename = f"{self.base_filename}.parquet"
+        part = 1
+        while os.path.exists(self.filename):
+            self.filename = f"{self.base_filename}.part{part}.parquet"
+            part += 1
+        self.row_group_size = row_group_size
+        self.max_buffer_bytes = max_buffer_bytes
+        self.schema = job_schema()
+        self._columns: list[list] = [[] for _ in JOB_FIELDS]
+        self._rows = 0
+        self._buffered_bytes = 0
+
+    def _open(self):
+        return pq.ParquetWriter(
+            self.filename,
+            self.schema,
+            compression="zstd",
+            use_dictionary=DICTIONARY_COLUMNS,
+        )
+
+    def _write_job(self, job: Job):
+        for column, value in zip(self._columns, job_values(job)):
+            column.append(value)
+        self._rows += 1
+        self._buffered_bytes += len(job.job_description or "")
+        if self._buffered_bytes >= self.max_buffer_bytes:
+            self._write_row_group()
+
+    def flush(self):
+        """Writes a row group once enough records have been buffered."""
+        if self._file is None or self._rows < self.row_group_size:
+            return
+        self._write_row_group()
+
+    def close(self):
+        """Writes any remaining records and finalizes the Parquet file."""
+        if self._file is None:
+            return
+        try:
+            if self._rows:
+                self._write_row_group()
+        finally:
+            self._file.close()
+            self._file = None
+
+    def _write_row_group(self):
+        with metrics.timer("writer_flush_seconds", writer=type(self).__name__):
+            table = pa.Table.from_pydict(
+                dict(zip(JOB_FIELDS, self._columns)), schema=self.schema
+            )
+            self._file.write_table(table, row_group_size=self._rows)
+        self._columns = [[] for _ in JOB_FIELDS]
+        self._rows = 0
+        self._buffered_bytes = 0
+        self._pending = 0
@@ -2,78 +2,343 @@ import os
 import time
 import json
 import random
-import requests
+import asyncio
+import httpx
 import logging
+from .file_lock import locked
 
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
 log = logging.getLogger(__name__)
 
 CACHE_FILE = "data/webshare_proxies_cache.json"
-API_URL = "https://proxy.webshare.io/api/v2/proxy/list/?page=1&page_size=20&mode=direct"
+HEALTH_FILE = "data/webshare_proxy_health.json"
+API_URL = "https://proxy.webshare.io/api/v2/proxy/list/"
+PAGE_SIZE = 100
+CACHE_TTL = 3600  # Seconds before the proxy list is fetched again
+REFRESH_RETRY_DELAY = 60  # Seconds to wait after a failed refresh
+
+OUTCOME_SUCCESS = "success"
+OUTCOME_TIMEOUT = "timeout"
+OUTCOME_BLOCKED = "blocked"
+OUTCOME_ERROR = "error"
+
+
+class ProxyHealth:
+    """
+    Rolling health of one proxy: exponentially weighted success rate and
+    latency, plus a circuit breaker that benches the proxy for `cooldown`
+    seconds after `failure_threshold` consecutive failures.
+    """
+
+    ALPHA = 0.3  # Weight of the newest outcome in the moving averages
+
+    def __init__(
+        self,
+        success_rate: float = 1.0,
+        latency: float | None = None,
+        consecutive_failures: int = 0,
+        benched_until: float = 0.0,
+    ):
+        self.success_rate = success_rate
+        self.latency = latency
+        self.consecutive_failures = consecutive_failures
+        self.benched_until = benched_until
+
+    def record(
+        self,
+        outcome: str,
+        latency: float | None,
+        failure_threshold: int,
+        cooldown: float,
+    ):
+        succeeded = outcome == OUTCOME_SUCCESS
+        self.success_rate += self.ALPHA * (float(succeeded) - self.success_rate)
+        if latency is not None:
+            self.latency = (
+                latency
+                if self.latency is None
+                else self.latency + self.ALPHA * (latency - self.latency)
+            )
+        if succeeded:
+            self.consecutive_failures = 0
+        else:
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= failure_threshold:
+                # Open the circuit. After the cooldown the proxy gets one
+                # trial request; another failure benches it again.
+                self.benched_until = time.time() + cooldown
+                self.consecutive_failures = failure_threshold - 1
+
+    def is_benched(self, now: float) -> bool:
+        return now < self.benched_until
+
+    def weight(self, reference_latency: float) -> float:
+        """Selection weight: recent success rate, discounted for slowness."""
+        latency = self.latency if self.latency is not None else reference_latency
+        # A small floor keeps struggling proxies in rotation so they can recover
+        return max(self.success_rate, 0.05) / (1 + latency / reference_latency)
+
+    def to_dict(self) -> dict:
+        return {
+            "success_rate": self.success_rate,
+            "latency": self.latency,
+            "consecutive_failures": self.consecutive_failures,
+            "benched_until": self.benched_until,
+        }
 
 
 class ProxyManager:
-    def __init__(self, api_key: str | None):
+    REFERENCE_LATENCY = 3.0  # Seconds; a proxy this slow gets half the weight
+
+    def __init__(
+        self,
+        api_key: str | None,
+        failure_threshold: int = 3,
+        cooldown: float = 600,
+        api_url: str = API_URL,
+        cache_ttl: float = CACHE_TTL,
+        shard: tuple[int, int] | None = None,
+    ):
         """
         Initializes the ProxyManager.
         If no api_key is provided, it operates in a disabled state.
+        Proxies that fail `failure_threshold` times in a row are benched for
+        `cooldown` seconds.
+        Only the on-disk cache is read here; `start()` fetches a fresh list
+        if needed and keeps it refreshed every `cache_ttl` seconds.
+        With `shard=(index, count)`, only every `count`-th proxy of the list
+        (starting at `index`) is used, so `count` scrape worker processes
+        spread over the list instead of sharing every proxy.
         """
         self.api_key = api_key
+        self.api_url = api_url
+        self.cache_ttl = cache_ttl
+        self.shard = shard
         self.proxies = []
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.health: dict[str, ProxyHealth] = {}
+        # Proxies whose health changed since the last save
+        self._changed: set[str] = set()
+        self._fetched_at = 0.0
+        self._refresh_task: asyncio.Task | None = None
         if self.api_key:
             # Ensure the cache directory exists
             os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
-            self.proxies = self._load_cached_proxies()
+            self.proxies = self._select_shard(self._load_cached_proxies())
+            self.health = self._load_health()
         else:
             log.info("ProxyManager initialized in disabled state (no API key found).")
 
+    async def start(self):
+        """
+        Fetches the proxy list if the cache is missing or stale, then starts
+        a background task that refreshes it whenever it expires.
+        """
+        if not self.api_key or self._refresh_task:
+            return
+        if not self.proxies or self._is_stale():
+            await self.refresh()
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def shutdown(self):
+        """Stops the background refresh task."""
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    def _select_shard(self, proxies: list[dict]) -> list[dict]:
+        """This manager's share of the list; all of it if the share is empty."""
+        if not self.shard:
+            return proxies
+        index, count = self.shard
+        return proxies[index::count] or proxies
+
+    def _is_stale(self) -> bool:
+        return time.time() - self._fetched_at >= self.cache_ttl
+
     def _load_cached_proxies(self):
-        if os.path.exists(CACHE_FILE):
+        """
+        Loads the cached list, even if it has expired, so there is something
+        to use until the first refresh completes.
+        """
+        if not os.path.exists(CACHE_FILE):
+            return []
+        try:
             with open(CACHE_FILE, "r") as f:
                 data = json.load(f)
-                # Cache is valid for 1 hour (3600 seconds)
-                if time.time() - data.get("timestamp", 0) < 3600:
-                    log.info("Using cached proxy list.")
-                    return data["proxies"]
-
-        return self._fetch_and_cache_proxies()
-
-    def _fetch_and_cache_proxies(self):
-        if not self.api_key:
+        except (OSError, ValueError) as e:
+            log.error(f"Ignoring unreadable proxy cache: {e}")
             return []
+        self._fetched_at = data.get("timestamp", 0)
+        if not self._is_stale():
+            log.info("Using cached proxy list.")
+        return data.get("proxies", [])
 
+    async def _refresh_loop(self):
+        while True:
+            delay = max(self._fetched_at + self.cache_ttl - time.time(), 0)
+            await asyncio.sleep(delay)
+            try:
+                refreshed = await self.refresh()
+            except Exception:
+                # Keep refreshing with the current list rather than stopping
+                log.exception("Unexpected error while refreshing the proxy list.")
+                refreshed = False
+            if not refreshed:
+                await asyncio.sleep(REFRESH_RETRY_DELAY)
+
+    async def refresh(self) -> bool:
+        """
+        Fetches every page of the proxy list and swaps it in. Scrapes in
+        flight keep the proxy they already picked. On failure the current
+        list is kept. Returns True if a new list was installed.
+        """
         log.info("Fetching fresh proxy list from Webshare...")
-        headers = {"Authorization": f"Token {self.api_key}"}
         try:
-            res = requests.get(API_URL, headers=headers)
-            res.raise_for_status()
-            raw = res.json().get("results", [])
-
-            proxies = [
-                {
-                    # This is the format Playwright's 'proxy' option prefers
-                    "playwright_format": {
-                        "server": f"http://{p['proxy_address']}:{p['port']}",
-                        "username": p["username"],
-                        "password": p["password"],
-                    },
-                    "location": f'{p["country_code"]} - {p.get("city_name", "N/A")}',
-                }
-                for p in raw
-                if p.get("valid")
-            ]
-
-            with open(CACHE_FILE, "w") as f:
-                json.dump({"timestamp": time.time(), "proxies": proxies}, f)
-            log.info(f"Successfully fetched and cached {len(proxies)} valid proxies.")
-            return proxies
-        except requests.exceptions.RequestException as e:
+            raw = await self._fetch_all_pages()
+        except (httpx.HTTPError, ValueError, AttributeError, TypeError) as e:
+            # ValueError and the rest: a page that isn't the JSON we expect
             log.error(f"Failed to fetch proxies: {e}")
-            return []
+            return False
+
+        proxies = []
+        malformed = 0
+        for entry in raw:
+            try:
+                if entry.get("valid"):
+                    proxies.append(_parse_proxy(entry))
+            except (AttributeError, KeyError, TypeError):
+                malformed += 1
+        if malformed:
+            log.warning(f"Skipped {malformed} malformed entries in the proxy list.")
+        if not proxies:
+            log.error("Proxy list came back empty; keeping the current list.")
+            return False
+
+        self.proxies = self._select_shard(proxies)
+        self._fetched_at = time.time()
+        _write_json_atomic(
+            CACHE_FILE, {"timestamp": self._fetched_at, "proxies": proxies}
+        )
+        log.info(f"Successfully fetched and cached {len(proxies)} valid proxies.")
+        return True
+
+    async def _fetch_all_pages(self) -> list[dict]:
+        """Follows the list endpoint's `next` links until every page is read."""
+        headers = {"Authorization": f"Token {self.api_key}"}
+        results = []
+        async with httpx.AsyncClient(timeout=30, headers=headers) as client:
+            url = self.api_url
+            params = {"mode": "direct", "page": 1, "page_size": PAGE_SIZE}
+            while url:
+                res = await client.get(url, params=params)
+                res.raise_for_status()
+                data = res.json()
+                results.extend(data.get("results", []))
+                # `next` is an absolute URL that already carries the params
+                url = data.get("next")
+                params = None
+        return results
+
+    @staticmethod
+    def proxy_key(proxy: dict) -> str:
+        """Stable identifier of a proxy entry, used to key its health."""
+        server = proxy["playwright_format"]
+        return f"{server.get('username', '')}@{server['server']}"
+
+    def _health_for(self, proxy: dict) -> ProxyHealth:
+        return self.health.setdefault(self.proxy_key(proxy), ProxyHealth())
 
     def get_random_proxy(self) -> dict | None:
+        """
+        Picks a proxy at random, weighted by its recent success rate and
+        latency. Benched proxies are skipped; if every proxy is benched, the
+        one whose cooldown ends first is used.
+        """
         if not self.proxies:
             return None
-        return random.choice(self.proxies)
+
+        now = time.time()
+        available = [p for p in self.proxies if not self._health_for(p).is_benched(now)]
+        if not available:
+            return min(self.proxies, key=lambda p: self._health_for(p).benched_until)
+
+        weights = [
+            self._health_for(p).weight(self.REFERENCE_LATENCY) for p in available
+        ]
+        return random.choices(available, weights=weights)[0]
+
+    def record_outcome(
+        self, proxy: dict | None, outcome: str, latency: float | None = None
+    ):
+        """
+        Records the result of a request made through a proxy: one of the
+        OUTCOME_* constants, plus the request latency in seconds if known.
+        """
+        if not proxy:
+            return
+        health = self._health_for(proxy)
+        was_benched = health.is_benched(time.time())
+        health.record(outcome, latency, self.failure_threshold, self.cooldown)
+        self._changed.add(self.proxy_key(proxy))
+        if not was_benched and health.is_benched(time.time()):
+            log.warning(
+                f"Benching proxy {proxy['location']} for {self.cooldown:.0f}s after repeated failures."
+            )
+
+    def _load_health(self) -> dict[str, ProxyHealth]:
+        if not os.path.exists(HEALTH_FILE):
+            return {}
+        try:
+            with open(HEALTH_FILE, "r") as f:
+                data = json.load(f)
+            return {key: ProxyHealth(**value) for key, value in data.items()}
+        except (OSError, ValueError, TypeError) as e:
+            log.error(f"Ignoring unreadable proxy health file: {e}")
+            return {}
+
+    def save_health(self):
+        """
+        Persists proxy health scores so the next run starts with them. Only
+        the proxies this process used are written over the file's current
+        scores, so scrape workers keep each other's.
+        """
+        if not self._changed:
+            return
+        with locked(HEALTH_FILE):
+            health = self._load_health()
+            health.update({key: self.health[key] for key in self._changed})
+            _write_json_atomic(
+                HEALTH_FILE, {key: h.to_dict() for key, h in health.items()}
+            )
+        self._changed.clear()
+
+
+def _parse_proxy(entry: dict) -> dict:
+    """Converts a Webshare proxy list entry to the format the scraper uses."""
+    return {
+        # This is the format Playwright's 'proxy' option prefers
+        "playwright_format": {
+            "server": f"http://{entry['proxy_address']}:{entry['port']}",
+            "username": entry["username"],
+            "password": entry["password"],
+        },
+        "location": f'{entry["country_code"]} - {entry.get("city_name", "N/A")}',
+    }
+
+
+def _write_json_atomic(path: str, data):
+    """
+    Writes JSON to a temporary file and renames it over `path`, so readers
+    (including other runs) never see a partially written file.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
@@ -0,0 +1,108 @@
+import asyncio
+import random
+import time
+from .metrics import metrics
+
+
+class _HostBucket:
+    """Token bucket for one host, with its own current rate."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+        self.healthy_streak = 0
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class HostRateLimiter:
+    """
+    A per-host token-bucket rate limiter with adaptive rates (AIMD).
+
+    Each host starts at `initial_rate` requests per second. Every
+    `increase_after` consecutive successes add `increase_step` to its rate, up
+    to `max_rate`. A block page or timeout multiplies it by `backoff_factor`,
+    down to `min_rate`. The bounds widen to include `initial_rate`, so a
+    healthy host never slows down and a failing one never speeds up. With
+    `share`, every rate and step is scaled by it, so processes that split
+    the hosts' budget between them ramp and back off like one limiter. Hosts
+    have independent buckets and locks, so jobs on different hosts never
+    wait on each other.
+    """
+
+    def __init__(
+        self,
+        initial_rate: float = 0.5,
+        min_rate: float = 0.05,
+        max_rate: float = 2.0,
+        burst: float = 1.0,
+        increase_step: float = 0.1,
+        increase_after: int = 3,
+        backoff_factor: float = 0.5,
+        jitter: float = 0.2,
+        share: float = 1.0,
+    ):
+        if initial_rate <= 0 or min_rate <= 0 or share <= 0:
+            raise ValueError("Request rates must be greater than 0.")
+        self.initial_rate = initial_rate * share
+        self.min_rate = min(min_rate, initial_rate) * share
+        self.max_rate = max(max_rate, initial_rate) * share
+        self.burst = burst
+        self.increase_step = increase_step * share
+        self.increase_after = increase_after
+        self.backoff_factor = backoff_factor
+        self.jitter = jitter
+        self.backoffs = 0
+        self._buckets: dict[str, _HostBucket] = {}
+
+    def _bucket(self, host: str) -> _HostBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = _HostBucket(self.initial_rate, self.burst)
+            self._buckets[host] = bucket
+        return bucket
+
+    async def acquire(self, host: str):
+        """Waits until a request to `host` is allowed, then consumes a token."""
+        bucket = self._bucket(host)
+        async with bucket.lock:
+            bucket.refill(time.monotonic())
+            if bucket.tokens < 1:
+                wait = (1 - bucket.tokens) / bucket.rate
+                # A little jitter keeps concurrent workers out of lockstep
+                wait *= 1 + random.uniform(0, self.jitter)
+                metrics.observe("rate_limit_wait_seconds", wait)
+                await asyncio.sleep(wait)
+                bucket.refill(time.monotonic())
+            bucket.tokens = max(bucket.tokens - 1, 0.0)
+
+    def record_success(self, host: str):
+        bucket = self._bucket(host)
+        bucket.healthy_streak += 1
+        if bucket.healthy_streak >= self.increase_after:
+            bucket.healthy_streak = 0
+            bucket.rate = min(self.max_rate, bucket.rate + self.increase_step)
+
+    def record_failure(self, host: str):
+        """Backs off after a block page or timeout from `host`."""
+        bucket = self._bucket(host)
+        bucket.healthy_streak = 0
+        bucket.rate = max(self.min_rate, bucket.rate * self.backoff_factor)
+        self.backoffs += 1
+
+    def rate_for(self, host: str) -> float:
+        return self._bucket(host).rate
+
+    def summary(self) -> str:
+        if not self._buckets:
+            return "no hosts contacted"
+        rates = sorted(bucket.rate for bucket in self._buckets.values())
+        return (
+            f"{len(rates)} hosts, {self.backoffs} backoffs, "
+            f"rates {rates[0]:.2f}-{rates[-1]:.2f} req/s"
+        )
@@ -0,0 +1,117 @@
+from collections import Counter
+from urllib.parse import urlsplit
+from playwright.async_api import (
+    BrowserContext,
+    Error as PlaywrightError,
+    Request,
+    Route,
+)
+
+# We only read the page text, so these never need to be downloaded.
+# Stylesheets are kept: they decide what inner_text() treats as visible.
+DEFAULT_BLOCKED_TYPES = {"image", "media", "font"}
+
+DEFAULT_TRACKER_DOMAINS = {
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googleadservices.com",
+    "googlesyndication.com",
+    "doubleclick.net",
+    "facebook.net",
+    "connect.facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+    "segment.com",
+    "segment.io",
+    "mixpanel.com",
+    "amplitude.com",
+    "fullstory.com",
+    "newrelic.com",
+    "nr-data.net",
+    "optimizely.com",
+    "criteo.com",
+    "criteo.net",
+    "taboola.com",
+    "outbrain.com",
+    "adnxs.com",
+    "adsrvr.org",
+    "quantserve.com",
+    "scorecardresearch.com",
+    "bat.bing.com",
+    "ads.linkedin.com",
+    "snap.licdn.com",
+}
+
+# Rough transfer sizes per resource type, used to estimate the bytes saved by
+# aborted requests (their real size is unknown because they never load).
+ESTIMATED_BYTES = {
+    "image": 40_000,
+    "media": 500_000,
+    "font": 30_000,
+    "script": 60_000,
+    "stylesheet": 20_000,
+}
+DEFAULT_ESTIMATED_BYTES = 10_000
+
+
+def _matches_domain(host: str, domains: set[str]) -> bool:
+    return any(host == domain or host.endswith(f".{domain}") for domain in domains)
+
+
+class ResourceBlockPolicy:
+    """
+    Aborts requests the scraper doesn't need: heavy resource types (images,
+    media, fonts) and anything sent to a known tracker or ad domain.
+
+    Pages on an `allow_domains` site still have heavy resources blocked, but
+    tracker and third-party requests go through, for sites that break when
+    their scripts are missing.
+    """
+
+    def __init__(
+        self,
+        blocked_types: set[str] | None = None,
+        tracker_domains: set[str] | None = None,
+        allow_domains: set[str] | None = None,
+    ):
+        self.blocked_types = (
+            DEFAULT_BLOCKED_TYPES if blocked_types is None else set(blocked_types)
+        )
+        self.tracker_domains = (
+            DEFAULT_TRACKER_DOMAINS if tracker_domains is None else set(tracker_domains)
+        )
+        self.allow_domains = set(allow_domains or ())
+        self.blocked_requests = Counter()
+        self.estimated_bytes_saved = 0
+
+    def should_block(self, resource_type: str, url: str, page_host: str) -> bool:
+        if resource_type in self.blocked_types:
+            return True
+        if _matches_domain(page_host, self.allow_domains):
+            return False
+        host = (urlsplit(url).hostname or "").lower()
+        return _matches_domain(host, self.tracker_domains)
+
+    async def apply(self, context: BrowserContext):
+        """
+        Installs the policy on every request made by the given context. The
+        allowlist is checked against the URL of the frame making the request,
+        i.e. the site a job link redirected to, not the link itself.
+        """
+
+        async def handle(route: Route, request: Request):
+            try:
+                frame_url = request.frame.url
+            except PlaywrightError:
+                frame_url = ""  # Service worker requests have no frame
+            page_host = (urlsplit(frame_url).hostname or "").lower()
+            if self.should_block(request.resource_type, request.url, page_host):
+                self.blocked_requests[request.resource_type] += 1
+                self.estimated_bytes_saved += ESTIMATED_BYTES.get(
+                    request.resource_type, DEFAULT_ESTIMATED_BYTES
+                )
+                await route.abort()
+            else:
+                await route.continue_()
+
+        await context.route("**/*", handle)
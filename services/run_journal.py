@@ -0,0 +1,126 @@
+import json
+import os
+import sqlite3
+import time
+from collections import Counter
+from typing import Iterator
+from models.job import Job
+from .data_writer import JOB_FIELDS
+from .dedup import job_key
+
+STATE_PENDING = "pending"  # Found by the search, not scraped yet
+STATE_SCRAPED = "scraped"  # Description fetched, not filtered or saved yet
+STATE_SAVED = "saved"
+STATE_FILTERED = "filtered"  # Dropped by the language filter
+STATE_BLOCKED = "blocked"  # Ended as SCRAPING_BLOCKED_MAX_RETRIES
+STATE_DUPLICATE = "duplicate"  # Skipped as a near-duplicate of an earlier posting
+
+
+class RunJournal:
+    """
+    A per-run SQLite journal of each job's progress through the pipeline,
+    stored next to the run's output files as `<run-id>.journal.sqlite3`.
+
+    The journal also keeps the run's search parameters, so a run can be
+    resumed (or its blocked jobs retried) from its run id alone. Job state
+    changes are only committed by `commit()`; callers commit once the
+    writers have checkpointed, so a journal entry never claims a job was
+    saved before its record is on disk.
+    """
+
+    def __init__(self, run_id: str, output_dir: str = "data"):
+        self.run_id = run_id
+        self.path = self.path_for(run_id, output_dir)
+        os.makedirs(output_dir, exist_ok=True)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS run (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                key TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                source_index INTEGER,
+                record TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """)
+        self._conn.commit()
+
+    @staticmethod
+    def path_for(run_id: str, output_dir: str = "data") -> str:
+        return os.path.join(output_dir, f"{run_id}.journal.sqlite3")
+
+    @classmethod
+    def exists(cls, run_id: str, output_dir: str = "data") -> bool:
+        return os.path.exists(cls.path_for(run_id, output_dir))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def save_params(self, params: dict):
+        """Stores the run's search parameters."""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO run (key, value) VALUES ('params', ?)",
+            (json.dumps(params),),
+        )
+        self._conn.commit()
+
+    def load_params(self) -> dict | None:
+        row = self._conn.execute(
+            "SELECT value FROM run WHERE key = 'params'"
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def record(self, job: Job, state: str):
+        """Sets a job's state. Takes effect on the next `commit()`."""
+        # The description is left out; redoing a job re-scrapes it anyway
+        record = {
+            name: getattr(job, name) for name in JOB_FIELDS if name != "job_description"
+        }
+        self._conn.execute(
+            "INSERT OR REPLACE INTO jobs"
+            " (key, state, source_index, record, updated_at)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (job_key(job), state, job.source_index, json.dumps(record), time.time()),
+        )
+
+    def state(self, job: Job) -> str | None:
+        """Returns the job's state, or None if this run hasn't seen it."""
+        row = self._conn.execute(
+            "SELECT state FROM jobs WHERE key = ?", (job_key(job),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def jobs(self, states: tuple[str, ...]) -> Iterator[Job]:
+        """Yields the jobs in any of `states`, in search order."""
+        placeholders = ", ".join("?" * len(states))
+        rows = self._conn.execute(
+            f"SELECT record FROM jobs WHERE state IN ({placeholders})"
+            " ORDER BY source_index",
+            states,
+        ).fetchall()
+        for (record,) in rows:
+            yield Job(**json.loads(record))
+
+    def next_index(self) -> int:
+        """The `source_index` to give the next newly found job."""
+        (highest,) = self._conn.execute("SELECT MAX(source_index) FROM jobs").fetchone()
+        return 0 if highest is None else highest + 1
+
+    def state_counts(self) -> Counter:
+        """Number of jobs in each state."""
+        return Counter(
+            dict(self._conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"))
+        )
+
+    def commit(self):
+        self._conn.commit()
+
+    def close(self):
+        self._conn.commit()
+        self._conn.close()
@@ -0,0 +1,145 @@
+import os
+import sqlite3
+import time
+from .dedup import canonicalize_url
+
+CACHE_DB = "data/scrape_cache.sqlite3"
+
+STATUS_OK = "ok"
+STATUS_BLOCKED = "blocked"
+
+
+class ScrapeCache:
+    """
+    A persistent, SQLite-backed cache of scrape results keyed by canonical URL.
+
+    Successful scrapes are kept for `ttl` seconds. Blocked results use the
+    shorter `negative_ttl`, so they are retried on a later run but not on
+    every run. Once the stored descriptions exceed `max_bytes`, the least
+    recently used entries are evicted.
+    """
+
+    EVICT_EVERY = 100  # Check the size limit once per this many writes
+
+    def __init__(
+        self,
+        path: str = CACHE_DB,
+        ttl: float = 7 * 24 * 3600,
+        negative_ttl: float = 6 * 3600,
+        max_bytes: int = 500 * 1024 * 1024,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS scrape_cache (
+                url TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                job_description TEXT,
+                email TEXT,
+                scraped_at REAL NOT NULL,
+                last_accessed REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+            """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_scrape_cache_lru"
+            " ON scrape_cache (last_accessed)"
+        )
+        self._conn.commit()
+
+    def get(self, url: str) -> dict | None:
+        """
+        Returns the cached result for a URL as a dict with `status`,
+        `job_description`, `email` and `scraped_at`, or None on a miss or if
+        the entry has expired.
+        """
+        key = canonicalize_url(url)
+        row = self._conn.execute(
+            "SELECT status, job_description, email, scraped_at"
+            " FROM scrape_cache WHERE url = ?",
+            (key,),
+        ).fetchone()
+
+        now = time.time()
+        if row:
+            status, job_description, email, scraped_at = row
+            ttl = self.ttl if status == STATUS_OK else self.negative_ttl
+            if now - scraped_at < ttl:
+                self._conn.execute(
+                    "UPDATE scrape_cache SET last_accessed = ? WHERE url = ?",
+                    (now, key),
+                )
+                self._conn.commit()
+                self.hits += 1
+                return {
+                    "status": status,
+                    "job_description": job_description,
+                    "email": email,
+                    "scraped_at": scraped_at,
+                }
+
+        self.misses += 1
+        return None
+
+    def put(
+        self,
+        url: str,
+        status: str,
+        job_description: str | None = None,
+        email: str | None = None,
+    ):
+        """Stores (or replaces) the scrape result for a URL."""
+        now = time.time()
+        size = len(job_description.encode("utf-8")) if job_description else 0
+        self._conn.execute(
+            "INSERT OR REPLACE INTO scrape_cache"
+            " (url, status, job_description, email, scraped_at, last_accessed, size)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (canonicalize_url(url), status, job_description, email, now, now, size),
+        )
+        self._conn.commit()
+
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self):
+        """
+        Drops expired entries, then the least recently used ones until the
+        cache fits in `max_bytes`.
+        """
+        now = time.time()
+        self._conn.execute(
+            "DELETE FROM scrape_cache WHERE"
+            " (status = ? AND scraped_at < ?) OR (status != ? AND scraped_at < ?)",
+            (STATUS_OK, now - self.ttl, STATUS_OK, now - self.negative_ttl),
+        )
+
+        (total,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM scrape_cache"
+        ).fetchone()
+        if total > self.max_bytes:
+            excess = total - self.max_bytes
+            freed = 0
+            doomed = []
+            for url, size in self._conn.execute(
+                "SELECT url, size FROM scrape_cache ORDER BY last_accessed"
+            ):
+                if freed >= excess:
+                    break
+                doomed.append((url,))
+                freed += size
+            self._conn.executemany("DELETE FROM scrape_cache WHERE url = ?", doomed)
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
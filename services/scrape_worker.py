@@ -0,0 +1,316 @@
+import asyncio
+import dataclasses
+import logging
+import os
+import signal
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from dotenv import load_dotenv
+from .content_extractor import ContentExtractor
+from .language_filter import _pool_context
+from .metrics import metrics
+from .proxy_manager import ProxyManager, API_URL as PROXY_API_URL
+from .rate_limiter import HostRateLimiter
+from .resource_policy import ResourceBlockPolicy
+from .scrape_cache import ScrapeCache
+from .scraper import ScraperService
+from .storage_state import StorageStateStore
+from .work_queue import WorkQueue
+
+log = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.1  # Seconds an idle worker first waits before claiming again
+MAX_POLL_INTERVAL = 1.0
+
+
+@dataclass
+class ScraperOptions:
+    """
+    How to set up a ScraperService. Picklable, so scrape worker processes
+    are set up the same way as an in-process scraper.
+    """
+
+    cache_ttl_hours: float = 168
+    use_cache: bool = True
+    block_resources: bool = True
+    allow_domains: list[str] = field(default_factory=list)
+    http_first: bool = True
+    host_rate: float = 0.5
+    # Share of the per-host rates (start, bounds and steps) this scraper may use
+    rate_share: float = 1.0
+    use_storage_state: bool = True
+    storage_state_ttl_hours: float = 24
+    extract_content: bool = True
+    max_description_chars: int = 20000
+
+
+def create_proxy_manager(shard: tuple[int, int] | None = None) -> ProxyManager | None:
+    """A ProxyManager for the Webshare account in the environment, if any."""
+    api_key = os.getenv("WEBSHARE_API_KEY")
+    if not api_key:
+        return None
+    return ProxyManager(
+        api_key=api_key,
+        api_url=os.getenv("WEBSHARE_API_URL", PROXY_API_URL),
+        shard=shard,
+    )
+
+
+def create_scraper_service(
+    options: ScraperOptions, proxy_manager: ProxyManager | None = None
+) -> ScraperService:
+    """Builds a ScraperService and the stores it uses from `options`."""
+    return ScraperService(
+        proxy_manager=proxy_manager,
+        cache=(
+            ScrapeCache(ttl=options.cache_ttl_hours * 3600)
+            if options.use_cache
+            else None
+        ),
+        resource_policy=(
+            ResourceBlockPolicy(allow_domains=set(options.allow_domains))
+            if options.block_resources
+            else None
+        ),
+        http_first=options.http_first,
+        rate_limiter=HostRateLimiter(
+            initial_rate=options.host_rate, share=options.rate_share
+        ),
+        storage_states=(
+            StorageStateStore(ttl=options.storage_state_ttl_hours * 3600)
+            if options.use_storage_state
+            else None
+        ),
+        extractor=(
+            ContentExtractor(max_chars=options.max_description_chars)
+            if options.extract_content
+            else None
+        ),
+    )
+
+
+def log_scraper_summary(scraper_service: ScraperService):
+    """Logs how a scraper's jobs were served, for the end-of-run summary."""
+    if scraper_service.cache:
+        log.info(f"Served from scrape cache: {scraper_service.cache.hits} jobs")
+    log.info(
+        f"Scraped over plain HTTP: {scraper_service.stats['http_scrapes']} jobs, "
+        f"with a browser: {scraper_service.stats['browser_scrapes']} jobs"
+    )
+    if scraper_service.extractor:
+        log.info(f"Content extraction: {scraper_service.extractor.summary()}")
+    log.info(f"Per-host rate limits: {scraper_service.rate_limiter.summary()}")
+    resource_policy = scraper_service.resource_policy
+    if resource_policy:
+        log.info(
+            f"Blocked requests: {sum(resource_policy.blocked_requests.values())} "
+            f"(~{resource_policy.estimated_bytes_saved / 1_000_000:.1f} MB saved)"
+        )
+
+
+class WorkerPool:
+    """
+    Scrape worker processes that take jobs from a WorkQueue.
+
+    Each process runs its own ScraperService (browser pool, HTTP sessions,
+    rate limiter) with its own share of the proxies, and `concurrency`
+    scrapes in flight. The per-host rates (the starting rate, its bounds
+    and steps) are split between the processes, so together they never
+    exceed what a single scraper may send to a site.
+
+    The process that owns the pool calls `check` regularly: it requeues
+    jobs whose lease expired and restarts workers that died, after
+    releasing their leases, up to `max_restarts` times per worker.
+    """
+
+    def __init__(
+        self,
+        queue: WorkQueue,
+        processes: int,
+        options: ScraperOptions,
+        concurrency: int = 1,
+        max_restarts: int = 3,
+    ):
+        self.queue = queue
+        self.count = processes
+        self.options = dataclasses.replace(
+            options, rate_share=options.rate_share / processes
+        )
+        self.concurrency = concurrency
+        self.max_restarts = max_restarts
+        self.restarts = Counter()
+        self._processes = {}
+        self._context = _pool_context()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # After an error, don't wait for workers to finish jobs nobody collects
+        self.stop(timeout=0 if exc_type else 60)
+
+    def _spawn(self, index: int):
+        worker = f"worker-{index}"
+        process = self._context.Process(
+            target=run_worker,
+            args=(
+                os.path.abspath(self.queue.path),
+                worker,
+                (index, self.count),
+                self.options,
+                self.concurrency,
+                logging.getLogger().getEffectiveLevel(),
+            ),
+            name=worker,
+        )
+        process.start()
+        self._processes[worker] = process
+
+    def start(self):
+        """
+        Starts the workers on an empty queue: jobs and flags an interrupted
+        run left in it are dropped, so queue jobs only after this.
+        """
+        dropped = self.queue.reset()
+        if dropped:
+            log.info(f"Dropped {dropped} jobs an earlier run left in the work queue.")
+        for index in range(self.count):
+            self._spawn(index)
+        log.info(f"Started {self.count} scrape worker processes")
+
+    def check(self):
+        """
+        Requeues jobs with expired leases and restarts dead workers. Until
+        `stop` closes the input, a worker that exits has died, even with
+        exit code 0 (e.g. after a SIGTERM from outside).
+
+        :raises RuntimeError: If every worker has died and used up its
+            restarts.
+        """
+        for index in range(self.count):
+            worker = f"worker-{index}"
+            process = self._processes.get(worker)
+            if process is None or process.is_alive():
+                continue
+            released = self.queue.release(worker)
+            log.warning(
+                f"Scrape worker {worker} exited with code {process.exitcode}; "
+                f"requeuing its {released} leased jobs."
+            )
+            metrics.inc("worker_exits_total")
+            if self.restarts[worker] < self.max_restarts:
+                self.restarts[worker] += 1
+                self._spawn(index)
+            else:
+                log.error(f"Not restarting {worker}: it died too many times.")
+                del self._processes[worker]
+        if not self._processes:
+            raise RuntimeError("Every scrape worker process has died.")
+
+        requeued = self.queue.reclaim_expired()
+        if requeued:
+            log.warning(f"Requeued {requeued} jobs whose worker lease expired.")
+
+    def stop(self, timeout: float = 60):
+        """
+        Lets the workers finish and exit, terminating any still running
+        after `timeout` seconds, then adds their metrics to this process's.
+        """
+        # Every query has been queued by now; workers exit once it's drained
+        self.queue.close_input()
+        deadline = time.monotonic() + timeout
+        for process in self._processes.values():
+            process.join(max(deadline - time.monotonic(), 0))
+        for worker, process in self._processes.items():
+            if process.is_alive():
+                if timeout:
+                    log.warning(f"Scrape worker {worker} didn't exit; terminating it.")
+                process.terminate()
+                process.join()
+        for state in self.queue.worker_metrics():
+            metrics.merge_state(state)
+
+
+def run_worker(
+    queue_path: str,
+    worker: str,
+    shard: tuple[int, int],
+    options: ScraperOptions,
+    concurrency: int,
+    log_level: int,
+):
+    """Entry point of a scrape worker process."""
+    load_dotenv()
+    logging.basicConfig(
+        level=log_level,
+        format=f"%(asctime)s - %(levelname)s - [{worker}] %(message)s",
+    )
+    try:
+        asyncio.run(_work(queue_path, worker, shard, options, concurrency))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+
+
+async def _work(
+    queue_path: str,
+    worker: str,
+    shard: tuple[int, int],
+    options: ScraperOptions,
+    concurrency: int,
+):
+    # SIGTERM from the pool unwinds like Ctrl-C, so the browsers get closed
+    try:
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGTERM, asyncio.current_task().cancel
+        )
+    except NotImplementedError:
+        pass  # Not supported by the Windows event loop
+
+    queue = WorkQueue(queue_path)
+    scraper_service = create_scraper_service(options, create_proxy_manager(shard))
+    try:
+        async with scraper_service:
+            heartbeat = asyncio.create_task(_renew_leases(queue, worker))
+            try:
+                await asyncio.gather(
+                    *(
+                        _scrape_jobs(queue, worker, scraper_service)
+                        for _ in range(max(1, concurrency))
+                    )
+                )
+            finally:
+                heartbeat.cancel()
+        log_scraper_summary(scraper_service)
+        queue.save_metrics(f"{worker}:{os.getpid()}", metrics.export_state())
+    finally:
+        if scraper_service.cache:
+            scraper_service.cache.close()
+        queue.close()
+
+
+async def _renew_leases(queue: WorkQueue, worker: str):
+    while True:
+        await asyncio.sleep(queue.lease_seconds / 3)
+        queue.renew(worker)
+
+
+async def _scrape_jobs(queue: WorkQueue, worker: str, scraper_service: ScraperService):
+    """Claims and scrapes jobs until the queue is drained."""
+    idle = POLL_INTERVAL
+    while True:
+        task = queue.claim(worker)
+        if task is None:
+            if queue.drained():
+                return
+            await asyncio.sleep(idle)
+            idle = min(idle * 2, MAX_POLL_INTERVAL)
+            continue
+        idle = POLL_INTERVAL
+
+        log.info(f"--- Processing job {task.job.source_index + 1} ---")
+        with metrics.timer("job_seconds"):
+            job = await scraper_service.enrich_job(task.job, refresh=task.refresh)
+        if not queue.complete(task.id, worker, job):
+            log.warning(f"Lost the lease on {job.url}; another worker redoes it.")
@@ -1,17 +1,44 @@
-import asyncio
+import logging
 import random
 import re
+import time
 from typing import List
-from playwright.async_api import (
-    async_playwright,
-    TimeoutError as PlaywrightTimeoutError,
-    Page,
+from collections import Counter
+from urllib.parse import urljoin, urlsplit
+import httpx
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from models.job import Job
+
+from .browser_pool import BrowserPool
+from .content_extractor import ContentExtractor, ParsedPage
+from .domain_strategy import DomainStrategy
+from .html_text import html_to_text
+from .http_session import create_http_session
+from .metrics import ATTEMPT_BUCKETS, metrics
+from .proxy_manager import (
+    ProxyManager,
+    OUTCOME_BLOCKED,
+    OUTCOME_ERROR,
+    OUTCOME_SUCCESS,
+    OUTCOME_TIMEOUT,
 )
-from playwright_stealth import Stealth
+from .rate_limiter import HostRateLimiter
+from .resource_policy import ResourceBlockPolicy
+from .scrape_cache import ScrapeCache, STATUS_BLOCKED, STATUS_OK
+from .storage_state import StorageStateStore
+
+# HTTP statuses that mean the site refused us rather than the page being missing
+BLOCKED_STATUS_CODES = {401, 403, 407, 429}
+
+log = logging.getLogger(__name__)
 
-from models.job import Job
 
-from .proxy_manager import ProxyManager
+def _host(url: str) -> str:
+    return (urlsplit(url).hostname or "").lower()
+
+
+class BlockedPageError(Exception):
+    """Raised when a page turns out to be a bot-detection/block page."""
 
 
 class ScraperService:
@@ -25,200 +52,426 @@ class ScraperService:
         "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:109.0) Gecko/20100101 Firefox/117.0",
     ]
     MAX_RETRIES = 3  # Configure how many times to retry a failed scrape
-
-    def __init__(self, proxy_manager: ProxyManager | None = None):
+    # Static pages with less text than this are assumed to be JS-rendered
+    MIN_STATIC_TEXT_LENGTH = 500
+    JS_REQUIRED_MARKERS = ("enable javascript", "javascript is required")
+    MAX_REDIRECTS = 5  # Redirect hops followed when resolving a tracking link
+
+    def __init__(
+        self,
+        proxy_manager: ProxyManager | None = None,
+        max_pages_per_browser: int = 50,
+        cache: ScrapeCache | None = None,
+        resource_policy: ResourceBlockPolicy | None = None,
+        http_first: bool = True,
+        rate_limiter: HostRateLimiter | None = None,
+        storage_states: StorageStateStore | None = None,
+        extractor: ContentExtractor | None = None,
+    ):
         """
         Initializes the scraper.
         Accepts an optional ProxyManager instance for robust scraping.
+        Browsers are shared across jobs through a BrowserPool, one per proxy,
+        and recycled after `max_pages_per_browser` pages.
+        If a ScrapeCache is given, cached results are returned without
+        opening a page, and every new result is stored in it.
+        If a ResourceBlockPolicy is given, it is installed on every context to
+        abort images, fonts, media and tracker requests.
+        With `http_first`, each page is first fetched with a plain HTTP GET
+        and Playwright is only used when that doesn't yield the description.
+        If a HostRateLimiter is given, every request waits for a token from
+        its host's bucket, and block pages/timeouts slow that host down.
+        If a StorageStateStore is given, each site's cookies and localStorage
+        are reused by later contexts with the same proxy, and dropped when
+        the site shows a block page.
+        If a ContentExtractor is given, only the posting itself is kept as
+        the description instead of the whole page's text.
         """
         self.proxy_manager = proxy_manager
+        self.cache = cache
+        self.resource_policy = resource_policy
+        self.http_first = http_first
+        self.rate_limiter = rate_limiter
+        self.storage_states = storage_states
+        self.extractor = extractor
+        self.domain_strategy = DomainStrategy()
+        self.stats = Counter(http_scrapes=0, browser_scrapes=0)
+        self._http_sessions: dict[str, httpx.AsyncClient] = {}
+        self.browser_pool = BrowserPool(
+            headless=True, max_pages_per_browser=max_pages_per_browser
+        )
+
+    async def start(self):
+        """
+        Starts the proxy manager and the browser pool. Must be awaited
+        before scraping; prefer
+        `async with ScraperService(...)` to get start/shutdown handled.
+        """
+        if self.proxy_manager:
+            await self.proxy_manager.start()
         if self.proxy_manager and self.proxy_manager.proxies:
-            print(
+            log.info(
                 f"Scraper initialized with ProxyManager ({len(self.proxy_manager.proxies)} proxies available)."
             )
         else:
-            print("Scraper initialized without proxies. Scraping may be less reliable.")
-
-    async def enrich_jobs_with_details(self, jobs: List[Job]) -> List[Job]:
-        print(f"Starting SIMPLIFIED scraping process for {len(jobs)} jobs...")
-
-        async with Stealth().use_async(async_playwright()) as p:
-            # You can set headless=False here to watch it work
-            browser = await p.chromium.launch(headless=False)
-
-            for index, job in enumerate(jobs):
-                if not job.url:
-                    continue
-
-                print(f"[{index + 1}/{len(jobs)}] Scraping URL: {job.url}")
-
-                context = await browser.new_context(
-                    user_agent=self.USER_AGENT,
-                    viewport={"width": 1920, "height": 1080},
-                    extra_http_headers={"Accept-Language": "en-US,en;q=0.9"},
-                )
-                page = await context.new_page()
-
-                try:
-                    # Step 1: Navigate to the job page provided by the API
-                    await page.goto(
-                        job.url, timeout=60000, wait_until="domcontentloaded"
-                    )
+            log.warning(
+                "Scraper initialized without proxies. Scraping may be less reliable."
+            )
+        await self.browser_pool.start()
 
-                    # Step 2: Scrape the content directly from this page's body
-                    body_text = await page.locator("body").inner_text(timeout=15000)
+    async def shutdown(self):
+        """
+        Closes all pooled browsers, the Playwright driver and the HTTP
+        sessions, stops the proxy list refresh, and saves the learned per-domain strategies and proxy
+        health scores.
+        """
+        await self.browser_pool.shutdown()
+        for session in self._http_sessions.values():
+            await session.aclose()
+        self._http_sessions.clear()
+        self.domain_strategy.save()
+        if self.proxy_manager:
+            await self.proxy_manager.shutdown()
+            self.proxy_manager.save_health()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.shutdown()
 
-                    # Step 3: Check for block pages and save the data
-                    if (
-                        "suspicious behaviour" in body_text
-                        or "access denied" in body_text.lower()
-                    ):
-                        print("  -> BLOCKED by bot detection.")
-                        job.job_description = "SCRAPING_BLOCKED"
-                    else:
-                        job.job_description = body_text.strip()
-                        print("  -> Successfully scraped job description.")
-                        found_emails = re.findall(self.EMAIL_REGEX, body_text)
-                        if found_emails:
-                            for email in found_emails:
-                                if (
-                                    "example.com" not in email
-                                    and "sentry.io" not in email
-                                ):
-                                    job.email = email
-                                    print(f"  -> Found email: {job.email}")
-                                    break
-
-                except Exception as e:
-                    print(f"  -> An unexpected error occurred: {e}")
-                finally:
-                    await context.close()
-                    sleep_time = random.uniform(3, 7)
-                    print(f"  -> Waiting for {sleep_time:.2f} seconds...")
-                    await asyncio.sleep(sleep_time)
-
-            await browser.close()
-        print("Scraping process complete.")
+    async def enrich_jobs_with_details(self, jobs: List[Job]) -> List[Job]:
+        log.info(f"Starting scraping process for {len(jobs)} jobs...")
+        for index, job in enumerate(jobs):
+            log.info(f"[{index + 1}/{len(jobs)}]")
+            await self.enrich_job(job)
+        log.info("Scraping process complete.")
         return jobs
 
-    async def enrich_job(self, job: Job) -> Job | None:
+    async def enrich_job(self, job: Job, refresh: bool = False) -> Job:
         """
-        Takes a single Job object, scrapes its URL, and returns the enriched object.
-        Returns None if a critical error occurs.
+        Scrapes the job's page and fills in its description and email.
+        With `refresh`, a cached result is ignored and the page is scraped
+        again; the new result still replaces the cached one. Which path
+        served the job, browser attempts, page timings and proxy outcomes
+        are recorded in the run metrics.
         """
         if not job.url:
-            return job  # Return as-is if no URL
-
-        print(f"Scraping URL: {job.url}")
-
-        async with Stealth().use_async(async_playwright()) as p:
-            browser = await p.chromium.launch(headless=True)
-            context = await browser.new_context(
-                user_agent=self.USER_AGENT,
-                # ... (other context settings) ...
-            )
-            page = await context.new_page()
+            return job
 
-            try:
-                await page.goto(job.url, timeout=60000, wait_until="domcontentloaded")
-                body_text = await page.locator("body").inner_text(timeout=15000)
-
-                if (
-                    "suspicious behaviour" in body_text
-                    or "access denied" in body_text.lower()
-                ):
-                    print("  -> BLOCKED by bot detection.")
-                    job.job_description = "SCRAPING_BLOCKED"
+        if self.cache and not refresh:
+            cached = self.cache.get(job.url)
+            if cached:
+                log.debug(f"Cache hit ({cached['status']}): {job.url}")
+                metrics.inc("scrapes_total", method="cache")
+                if cached["status"] == STATUS_OK:
+                    job.job_description = cached["job_description"]
+                    job.email = cached["email"]
                 else:
-                    job.job_description = body_text.strip()
-                    print("  -> Successfully scraped job description.")
-                    found_emails = re.findall(self.EMAIL_REGEX, body_text)
-                    if found_emails:
-                        for email in found_emails:
-                            if "example.com" not in email and "sentry.io" not in email:
-                                job.email = email
-                                print(f"  -> Found email: {job.email}")
-                                break
-
+                    job.job_description = "SCRAPING_BLOCKED_MAX_RETRIES"
                 return job
 
-            except Exception as e:
-                print(
-                    f"  -> An unexpected error occurred while scraping {job.url}: {e}"
-                )
-                job.job_description = f"SCRAPING_FAILED: {e}"
-                return job  # Return the job with an error message
-            finally:
-                await context.close()
-                await browser.close()
-
-    async def enrich_job(self, job: Job) -> Job:
-        if not job.url:
-            return job
-
-        print(f"Scraping URL: {job.url}")
+        # Per-site decisions are made for the site the job lives on, not for
+        # the tracking link that leads there
+        url = await self._resolve_url(job.url)
+        host = _host(url)
+        if self.http_first and not self.domain_strategy.prefers_browser(host):
+            description, url = await self._fetch_static_text(url, host)
+            host = _host(url)
+            self.domain_strategy.record(host, http_ok=description is not None)
+            if description is not None:
+                log.info(f"Fetched over HTTP: {job.url}")
+                self.stats["http_scrapes"] += 1
+                metrics.inc("scrapes_total", method="http")
+                return self._store_result(job, description)
+
+        log.info(f"Scraping URL: {job.url}")
 
         for attempt in range(self.MAX_RETRIES):
-            browser = (
-                None  # Initialize browser to None to ensure it's in scope for finally
-            )
+            metrics.inc("browser_attempts_total")
             proxy_details = (
                 self.proxy_manager.get_random_proxy() if self.proxy_manager else None
             )
-            launch_options = {"headless": True}
+            proxy = proxy_details["playwright_format"] if proxy_details else None
             if proxy_details:
-                launch_options["proxy"] = proxy_details["playwright_format"]
-                print(
+                log.debug(
                     f"  -> Attempt {attempt + 1}/{self.MAX_RETRIES} using proxy from {proxy_details['location']}"
                 )
             else:
-                print(f"  -> Attempt {attempt + 1}/{self.MAX_RETRIES} using local IP.")
+                log.debug(
+                    f"  -> Attempt {attempt + 1}/{self.MAX_RETRIES} using local IP."
+                )
 
+            context_options = {
+                "user_agent": random.choice(self.USER_AGENTS),
+                "viewport": {"width": 1920, "height": 1080},
+                "extra_http_headers": {"Accept-Language": "en-US,en;q=0.9"},
+            }
+            # Reuse the cookies/localStorage from this site's last visit
+            # through the same proxy, to skip consent walls and challenges.
+            # States are saved under the host the page ended up on, which
+            # links through a known redirector were resolved to above.
+            identity = BrowserPool.identity_for(proxy)
+            if self.storage_states:
+                storage_state = self.storage_states.get(host, identity)
+                if storage_state:
+                    context_options["storage_state"] = storage_state
+                    metrics.inc("storage_state_total", event="reused")
+
+            if self.rate_limiter:
+                await self.rate_limiter.acquire(host)
+            final_host = host
+            started = time.monotonic()
             try:
-                async with Stealth().use_async(async_playwright()) as p:
-                    browser = await p.chromium.launch(**launch_options)
-                    context = await browser.new_context(
-                        user_agent=random.choice(self.USER_AGENTS),
-                        viewport={"width": 1920, "height": 1080},
-                        extra_http_headers={"Accept-Language": "en-US,en;q=0.9"},
-                    )
+                async with self.browser_pool.context(
+                    proxy, **context_options
+                ) as context:
+                    if self.resource_policy:
+                        await self.resource_policy.apply(context)
                     page = await context.new_page()
 
-                    await page.goto(
-                        job.url, timeout=10000, wait_until="domcontentloaded"
-                    )
-                    body_text = await page.locator("body").inner_text(timeout=15000)
+                    with metrics.timer("page_goto_seconds"):
+                        await page.goto(
+                            url, timeout=10000, wait_until="domcontentloaded"
+                        )
+                    self._note_redirect(url, page.url)
+                    final_host = _host(page.url) or host
+                    if self.extractor:
+                        with metrics.timer("page_content_seconds"):
+                            html = await page.content()
+                        parsed, body_text = self._parse_page(html)
+                    else:
+                        with metrics.timer("page_inner_text_seconds"):
+                            body_text = await page.locator("body").inner_text(
+                                timeout=15000
+                            )
+                        parsed = None
 
-                    if (
-                        "suspicious behaviour" in body_text
-                        or "access denied" in body_text.lower()
-                    ):
-                        raise ValueError("Blocked by bot detection")
+                    if self._is_block_page(body_text):
+                        raise BlockedPageError("Blocked by bot detection")
+                    description = self._description(parsed, body_text, page.url)
 
                     # --- Success Case ---
-                    job.job_description = body_text.strip()
-                    found_emails = re.findall(self.EMAIL_REGEX, body_text)
-                    if found_emails:
-                        for email in found_emails:
-                            if "example.com" not in email and "sentry.io" not in email:
-                                job.email = email
-                                break
-                    print("  -> Scrape successful.")
-                    return job  # Return immediately on success
+                    log.debug("  -> Scrape successful.")
+                    self._record_outcome(
+                        final_host,
+                        proxy_details,
+                        OUTCOME_SUCCESS,
+                        time.monotonic() - started,
+                    )
+                    self.stats["browser_scrapes"] += 1
+                    metrics.inc("scrapes_total", method="browser")
+                    if self.storage_states and self.storage_states.needs_save(
+                        final_host, identity
+                    ):
+                        self.storage_states.save(
+                            final_host, identity, await context.storage_state()
+                        )
+                        metrics.inc("storage_state_total", event="saved")
+                    metrics.observe(
+                        "browser_attempts_per_job", attempt + 1, buckets=ATTEMPT_BUCKETS
+                    )
+                    return self._store_result(job, description)
 
             except Exception as e:
-                print(f"  -> Attempt failed: {e}")
-                if attempt < self.MAX_RETRIES - 1:
-                    await asyncio.sleep(random.uniform(2, 5))
-                # The loop continues to the next attempt
-
-            finally:
-                # ---  CLEANUP ---
-                # This block runs every time, whether the 'try' succeeded or failed.
-                if browser:
-                    await browser.close()
+                log.warning(f"  -> Attempt failed: {e}")
+                if isinstance(e, BlockedPageError):
+                    outcome = OUTCOME_BLOCKED
+                    # The saved state may be what got us flagged
+                    if self.storage_states:
+                        self.storage_states.invalidate(final_host, identity)
+                        metrics.inc("storage_state_total", event="invalidated")
+                elif isinstance(e, PlaywrightTimeoutError):
+                    outcome = OUTCOME_TIMEOUT
+                else:
+                    outcome = OUTCOME_ERROR
+                self._record_outcome(final_host, proxy_details, outcome)
+                # The loop continues to the next attempt, paced by the
+                # host's rate limiter (which just backed off if we were
+                # blocked or timed out)
 
         # --- All Retries Failed Case ---
-        print(f"  -> All {self.MAX_RETRIES} attempts failed for this URL.")
+        log.warning(f"  -> All {self.MAX_RETRIES} attempts failed for {job.url}.")
+        metrics.inc("scrapes_total", method="blocked")
+        metrics.observe(
+            "browser_attempts_per_job", self.MAX_RETRIES, buckets=ATTEMPT_BUCKETS
+        )
         job.job_description = "SCRAPING_BLOCKED_MAX_RETRIES"
+        if self.cache:
+            self.cache.put(job.url, STATUS_BLOCKED)
+        return job
+
+    def _record_outcome(
+        self,
+        host: str,
+        proxy_details: dict | None,
+        outcome: str,
+        latency: float | None = None,
+    ):
+        """
+        Feeds a request's outcome to the proxy scores, the host's rate and
+        the run metrics.
+        """
+        metrics.inc(
+            "proxy_requests_total",
+            proxy=(
+                proxy_details["playwright_format"]["server"]
+                if proxy_details
+                else "local"
+            ),
+            outcome=outcome,
+        )
+        if self.proxy_manager:
+            self.proxy_manager.record_outcome(proxy_details, outcome, latency)
+        if self.rate_limiter:
+            if outcome == OUTCOME_SUCCESS:
+                self.rate_limiter.record_success(host)
+            elif outcome in (OUTCOME_BLOCKED, OUTCOME_TIMEOUT):
+                self.rate_limiter.record_failure(host)
+
+    @staticmethod
+    def _is_block_page(body_text: str) -> bool:
+        return (
+            "suspicious behaviour" in body_text or "access denied" in body_text.lower()
+        )
+
+    def _parse_page(self, html: str) -> tuple[ParsedPage | None, str]:
+        """
+        Returns the page parsed for the extractor (if there is one) and its
+        full text, which the block/JS checks look at.
+        """
+        if self.extractor:
+            parsed = self.extractor.parse(html)
+            return parsed, parsed.text
+        return None, html_to_text(html)
+
+    def _description(self, parsed: ParsedPage | None, body_text: str, url: str) -> str:
+        """
+        The posting text of a page that passed the checks, so rejected
+        pages are never extracted. `url` is the page's final URL, which
+        picks the extractor's selector.
+        """
+        if parsed is None:
+            return body_text
+        return self.extractor.extract_page(parsed, url).text
+
+    def _store_result(self, job: Job, description: str) -> Job:
+        """Fills in the description and first real email, and caches them."""
+        job.job_description = description.strip()
+        found_emails = re.findall(self.EMAIL_REGEX, job.job_description)
+        if found_emails:
+            for email in found_emails:
+                if "example.com" not in email and "sentry.io" not in email:
+                    job.email = email
+                    break
+        if self.cache:
+            self.cache.put(job.url, STATUS_OK, job.job_description, job.email)
         return job
+
+    def _note_redirect(self, requested_url: str, final_url: str):
+        """Remembers the requested host as a redirector if it led elsewhere."""
+        requested_host = _host(requested_url)
+        if requested_host and requested_host != _host(final_url):
+            if not self.domain_strategy.redirects(requested_host):
+                log.debug(f"{requested_host} redirects to other sites")
+            self.domain_strategy.record_redirect(requested_host)
+
+    async def _resolve_url(self, url: str) -> str:
+        """
+        Follows the redirects of a link to a known redirecting host, without
+        requesting the page it ends up at. Returns the URL to scrape (the
+        link itself if its host isn't known to redirect, or on errors).
+        """
+        for _ in range(self.MAX_REDIRECTS):
+            if not self.domain_strategy.redirects(_host(url)):
+                return url
+            proxy_details = (
+                self.proxy_manager.get_random_proxy() if self.proxy_manager else None
+            )
+            proxy = proxy_details["playwright_format"] if proxy_details else None
+            try:
+                with metrics.timer("redirect_resolve_seconds"):
+                    async with self._http_session_for(proxy).stream(
+                        "GET", url, follow_redirects=False
+                    ) as response:
+                        location = response.headers.get("location")
+            except httpx.HTTPError:
+                return url
+            if not response.has_redirect_location or not location:
+                return url
+            url = urljoin(url, location)
+        return url
+
+    def _http_session_for(self, proxy: dict | None) -> httpx.AsyncClient:
+        """Returns the pooled HTTP session for a proxy, creating it on first use."""
+        key = BrowserPool.identity_for(proxy)
+        session = self._http_sessions.get(key)
+        if session is None:
+            proxy_url = None
+            if proxy:
+                scheme, _, address = proxy["server"].partition("://")
+                credentials = ""
+                if proxy.get("username"):
+                    credentials = f"{proxy['username']}:{proxy.get('password', '')}@"
+                proxy_url = f"{scheme}://{credentials}{address}"
+            session = create_http_session(
+                timeout=10.0,
+                proxy=proxy_url,
+                headers={
+                    "User-Agent": random.choice(self.USER_AGENTS),
+                    "Accept": "text/html,application/xhtml+xml",
+                    "Accept-Language": "en-US,en;q=0.9",
+                },
+            )
+            self._http_sessions[key] = session
+        return session
+
+    async def _fetch_static_text(self, url: str, host: str) -> tuple[str | None, str]:
+        """
+        Fetches a page with a plain HTTP GET and returns its description, or
+        None if the response looks blocked, JS-rendered or too short to be a
+        posting, along with the URL the request ended up at after redirects.
+        """
+        proxy_details = (
+            self.proxy_manager.get_random_proxy() if self.proxy_manager else None
+        )
+        proxy = proxy_details["playwright_format"] if proxy_details else None
+        if self.rate_limiter:
+            await self.rate_limiter.acquire(host)
+        started = time.monotonic()
+        try:
+            with metrics.timer("http_fetch_seconds"):
+                response = await self._http_session_for(proxy).get(url)
+        except httpx.TimeoutException:
+            self._record_outcome(host, proxy_details, OUTCOME_TIMEOUT)
+            return None, url
+        except httpx.HTTPError:
+            self._record_outcome(host, proxy_details, OUTCOME_ERROR)
+            return None, url
+        final_url = str(response.url)
+        self._note_redirect(url, final_url)
+        # Outcomes count for the site that answered, not a redirector
+        host = _host(final_url) or host
+
+        if response.status_code in BLOCKED_STATUS_CODES:
+            self._record_outcome(host, proxy_details, OUTCOME_BLOCKED)
+            return None, final_url
+        if response.status_code != 200 or "html" not in response.headers.get(
+            "content-type", ""
+        ):
+            return None, final_url
+
+        parsed, body_text = self._parse_page(response.text)
+        if self._is_block_page(body_text):
+            self._record_outcome(host, proxy_details, OUTCOME_BLOCKED)
+            return None, final_url
+        # The proxy did its job even if the page turns out to need a browser
+        self._record_outcome(
+            host, proxy_details, OUTCOME_SUCCESS, time.monotonic() - started
+        )
+        if len(body_text) < self.MIN_STATIC_TEXT_LENGTH:
+            return None, final_url
+        if any(marker in body_text.lower() for marker in self.JS_REQUIRED_MARKERS):
+            return None, final_url
+        return self._description(parsed, body_text, final_url), final_url
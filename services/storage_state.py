@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import time
+
+STORAGE_STATE_DIR = "data/storage_states"
+
+
+class StorageStateStore:
+    """
+    Persists Playwright storage state (cookies and localStorage) per job
+    site and proxy identity, so a new context on a site we've already
+    visited skips its cookie-consent overlay or bot challenge.
+
+    Each state is a JSON file under `data/storage_states/`, named by a hash
+    of the host and identity (which may contain proxy credentials). States
+    expire `ttl` seconds after they were saved. A state that is still in use
+    is saved again once it is older than `refresh_after` seconds, so the
+    site's latest cookies are kept without writing after every page.
+    """
+
+    def __init__(
+        self,
+        directory: str = STORAGE_STATE_DIR,
+        ttl: float = 24 * 3600,
+        refresh_after: float = 3600,
+    ):
+        self.directory = directory
+        self.ttl = ttl
+        self.refresh_after = refresh_after
+        self._states: dict[str, tuple[float, dict]] = {}
+        os.makedirs(directory, exist_ok=True)
+        self.evict()
+
+    def _path(self, host: str, identity: str) -> str:
+        digest = hashlib.sha1(f"{host}|{identity}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def _load(self, host: str, identity: str) -> tuple[float, dict] | None:
+        path = self._path(host, identity)
+        entry = self._states.get(path)
+        if entry is None:
+            try:
+                with open(path, "r") as f:
+                    data = json.load(f)
+                entry = (data["saved_at"], data["state"])
+            except (OSError, ValueError, KeyError):
+                return None
+            self._states[path] = entry
+        if time.time() - entry[0] >= self.ttl:
+            self.invalidate(host, identity)
+            return None
+        return entry
+
+    def get(self, host: str, identity: str) -> dict | None:
+        """Returns the saved state for a site and proxy, or None if there's none."""
+        entry = self._load(host, identity)
+        return entry[1] if entry else None
+
+    def needs_save(self, host: str, identity: str) -> bool:
+        """True if there's no saved state, or it's due for a refresh."""
+        entry = self._load(host, identity)
+        return entry is None or time.time() - entry[0] >= self.refresh_after
+
+    def save(self, host: str, identity: str, state: dict):
+        """Stores a context's storage state atomically."""
+        path = self._path(host, identity)
+        saved_at = time.time()
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"host": host, "saved_at": saved_at, "state": state}, f)
+        os.replace(tmp_path, path)
+        self._states[path] = (saved_at, state)
+
+    def invalidate(self, host: str, identity: str):
+        """Drops a saved state, e.g. after it led to a block page."""
+        path = self._path(host, identity)
+        self._states.pop(path, None)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        """Deletes expired state files."""
+        now = time.time()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if now - os.path.getmtime(path) >= self.ttl:
+                    os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,130 @@
+import json
+import os
+import sqlite3
+import time
+from models.job import Job
+from models.watermark import Watermark
+
+WATERMARK_DB = "data/watermarks.sqlite3"
+
+
+def query_key(what: str, where: str, remote_only: bool) -> str:
+    """Identifies a search across runs."""
+    remote = "remote" if remote_only else "onsite"
+    return f"{what.strip().lower()}|{where.strip().lower()}|{remote}"
+
+
+class WatermarkStore:
+    """
+    Per-query, per-client watermarks in SQLite, so a repeated search only
+    fetches the postings that appeared since its last run.
+
+    Jobs handed out by a search are `observe`d; the watermarks only move
+    once `commit` is called after the run has processed them, so an
+    interrupted run fetches the same postings again next time. The covered
+    range of posting times only moves for clients `mark_covered`, i.e. whose
+    newest-first listing was handed out from the top down to a known
+    posting time: it grows if that reaches the previous range, and is
+    replaced by the new one otherwise (when the page limit left a gap).
+    After a search cut short by --limit or a failed request only the ids
+    are kept, so the postings it never handed out are still fetched next
+    time. Up to `max_seen_ids` ids are kept per query and client, newest
+    first.
+    """
+
+    def __init__(self, path: str = WATERMARK_DB, max_seen_ids: int = 2000):
+        self.path = path
+        self.max_seen_ids = max_seen_ids
+        self._pending: dict[tuple[str, str], Watermark] = {}
+        self._covered: dict[tuple[str, str], str | None] = {}
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS watermarks (
+                query TEXT NOT NULL,
+                client TEXT NOT NULL,
+                newest_posted_at TEXT,
+                oldest_posted_at TEXT,
+                seen_ids TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (query, client)
+            )
+            """)
+        self._conn.commit()
+
+    def get(self, query: str, client: str) -> Watermark | None:
+        """Returns the committed watermark, or None if the query never ran."""
+        row = self._conn.execute(
+            "SELECT newest_posted_at, oldest_posted_at, seen_ids FROM watermarks"
+            " WHERE query = ? AND client = ?",
+            (query, client),
+        ).fetchone()
+        if row is None:
+            return None
+        return Watermark(
+            newest_posted_at=row[0],
+            oldest_posted_at=row[1],
+            seen_ids=json.loads(row[2]),
+        )
+
+    def observe(self, query: str, client: str, job: Job):
+        """Notes a job a search handed out, for the next `commit`."""
+        pending = self._pending.setdefault((query, client), Watermark())
+        if job.posted_at and (
+            pending.newest_posted_at is None or job.posted_at > pending.newest_posted_at
+        ):
+            pending.newest_posted_at = job.posted_at
+        if job.source_id is not None:
+            pending.seen_ids.append(job.source_id)
+
+    def mark_covered(self, query: str, client: str, oldest_posted_at: str | None):
+        """
+        Notes that a search handed out every new job of a client from the top
+        of its listing down to `oldest_posted_at`, or all of them if None.
+        """
+        self._covered[(query, client)] = oldest_posted_at
+
+    def commit(self):
+        """Moves the watermarks past every job observed since the last commit."""
+        now = time.time()
+        for (query, client), observed in self._pending.items():
+            previous = self.get(query, client) or Watermark()
+            newest, oldest = previous.newest_posted_at, previous.oldest_posted_at
+            if (query, client) in self._covered:
+                down_to = self._covered[(query, client)]
+                top = max(
+                    filter(None, (newest, observed.newest_posted_at)), default=None
+                )
+                if down_to is None:
+                    # The whole listing; with a previous range, Adzuna only
+                    # listed the postings since it
+                    oldest = oldest if newest else None
+                    newest = top
+                elif newest and down_to <= newest:
+                    # Reached the previous range, so the two join up
+                    oldest = oldest and min(oldest, down_to)
+                    newest = top
+                elif observed.newest_posted_at:
+                    oldest, newest = down_to, observed.newest_posted_at
+            seen_ids = list(dict.fromkeys(observed.seen_ids + previous.seen_ids))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO watermarks"
+                " (query, client, newest_posted_at, oldest_posted_at, seen_ids,"
+                " updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    query,
+                    client,
+                    newest,
+                    oldest,
+                    json.dumps(seen_ids[: self.max_seen_ids]),
+                    now,
+                ),
+            )
+        self._conn.commit()
+        self._pending.clear()
+        self._covered.clear()
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,262 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from models.job import Job
+from .data_writer import JOB_FIELDS
+from .metrics import metrics
+
+TASK_QUEUED = "queued"  # Waiting for a worker
+TASK_LEASED = "leased"  # Claimed by a worker until its lease expires
+TASK_DONE = "done"  # Scraped; the result waits for the collector
+TASK_FAILED = "failed"  # Its workers kept dying; given up on
+
+
+@dataclass
+class Task:
+    """A job handed out by the queue, with the id to report it back under."""
+
+    id: int
+    job: Job
+    refresh: bool = False
+    failed: bool = False
+
+
+def _job_record(job: Job) -> str:
+    return json.dumps({name: getattr(job, name) for name in JOB_FIELDS})
+
+
+class WorkQueue:
+    """
+    A durable SQLite queue of jobs to scrape, shared by the process that
+    searches and collects results and the scrape worker processes.
+
+    Workers `claim` a job with a lease of `lease_seconds`, keep the leases
+    of the jobs they are working on alive with `renew`, and `complete` each
+    job with the scraped result. `reclaim_expired` puts jobs whose lease
+    ran out (their worker crashed or hung) back in the queue; after
+    `max_attempts` leases a job is marked failed instead, so one page that
+    kills its worker can't take the others down with it. The collector
+    reads finished jobs with `collect` and deletes them with `ack` once
+    they are saved.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 60, max_attempts: int = 3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Transactions are explicit (BEGIN IMMEDIATE), so concurrent claims
+        # from several processes never hand out the same job
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY,
+                run_id TEXT NOT NULL,
+                record TEXT NOT NULL,
+                refresh INTEGER NOT NULL,
+                state TEXT NOT NULL,
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT
+            )
+            """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tasks_state ON tasks (state, id)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tasks_run ON tasks (run_id, state)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+
+    @contextmanager
+    def _transaction(self):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # --- Producer and collector side ---
+
+    def reset(self) -> int:
+        """
+        Empties the queue, including the closed-input flag and worker
+        metrics, e.g. what an interrupted run left behind (its jobs are
+        queued again from its journal). Returns the number of jobs dropped.
+        """
+        with self._transaction():
+            dropped = self._conn.execute("DELETE FROM tasks").rowcount
+            self._conn.execute("DELETE FROM meta")
+        return dropped
+
+    def put(self, job: Job, run_id: str, refresh: bool = False):
+        """Queues a job to be scraped for a run."""
+        self._conn.execute(
+            "INSERT INTO tasks (run_id, record, refresh, state) VALUES (?, ?, ?, ?)",
+            (run_id, _job_record(job), int(refresh), TASK_QUEUED),
+        )
+
+    def close_input(self):
+        """Tells the workers no more jobs will be queued."""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('input_closed', '1')"
+        )
+
+    def collect(self, run_id: str, limit: int = 100) -> list[Task]:
+        """
+        The run's finished jobs (scraped, or failed), oldest first. They stay
+        in the queue until they are `ack`ed.
+        """
+        rows = self._conn.execute(
+            "SELECT id, record, result, state FROM tasks"
+            " WHERE run_id = ? AND state IN (?, ?) ORDER BY id LIMIT ?",
+            (run_id, TASK_DONE, TASK_FAILED, limit),
+        ).fetchall()
+        return [
+            Task(
+                id=task_id,
+                job=Job(**json.loads(result or record)),
+                failed=state == TASK_FAILED,
+            )
+            for task_id, record, result, state in rows
+        ]
+
+    def ack(self, task_id: int):
+        """Deletes a collected job."""
+        self._conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+
+    def outstanding(self, run_id: str) -> int:
+        """Jobs of the run not collected yet."""
+        (count,) = self._conn.execute(
+            "SELECT COUNT(*) FROM tasks WHERE run_id = ?", (run_id,)
+        ).fetchone()
+        return count
+
+    def reclaim_expired(self) -> int:
+        """
+        Requeues the jobs whose lease has expired, or fails them once they
+        have been leased `max_attempts` times. Returns how many were requeued.
+        """
+        now = time.time()
+        with self._transaction():
+            failed = self._conn.execute(
+                "UPDATE tasks SET state = ?, worker = NULL"
+                " WHERE state = ? AND lease_expires < ? AND attempts >= ?",
+                (TASK_FAILED, TASK_LEASED, now, self.max_attempts),
+            ).rowcount
+            requeued = self._conn.execute(
+                "UPDATE tasks SET state = ?, worker = NULL"
+                " WHERE state = ? AND lease_expires < ?",
+                (TASK_QUEUED, TASK_LEASED, now),
+            ).rowcount
+        if failed:
+            metrics.inc("work_queue_reclaimed_total", outcome="failed", value=failed)
+        if requeued:
+            metrics.inc(
+                "work_queue_reclaimed_total", outcome="requeued", value=requeued
+            )
+        return requeued
+
+    def release(self, worker: str) -> int:
+        """
+        Expires every lease a worker holds, e.g. once its process has died,
+        so `reclaim_expired` hands its jobs out again right away. Returns the
+        number of leases.
+        """
+        return self._conn.execute(
+            "UPDATE tasks SET lease_expires = 0 WHERE state = ? AND worker = ?",
+            (TASK_LEASED, worker),
+        ).rowcount
+
+    def save_metrics(self, worker: str, state: dict):
+        """Stores a worker process's exported metrics for the collector."""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            (f"metrics:{worker}", json.dumps(state)),
+        )
+
+    def worker_metrics(self) -> list[dict]:
+        """The metrics every worker process has stored."""
+        rows = self._conn.execute(
+            "SELECT value FROM meta WHERE key LIKE 'metrics:%'"
+        ).fetchall()
+        return [json.loads(value) for (value,) in rows]
+
+    # --- Worker side ---
+
+    def claim(self, worker: str) -> Task | None:
+        """Leases the oldest queued job to a worker, or returns None."""
+        with self._transaction():
+            row = self._conn.execute(
+                "SELECT id, record, refresh FROM tasks WHERE state = ?"
+                " ORDER BY id LIMIT 1",
+                (TASK_QUEUED,),
+            ).fetchone()
+            if row is None:
+                return None
+            task_id, record, refresh = row
+            self._conn.execute(
+                "UPDATE tasks SET state = ?, worker = ?, lease_expires = ?,"
+                " attempts = attempts + 1 WHERE id = ?",
+                (TASK_LEASED, worker, time.time() + self.lease_seconds, task_id),
+            )
+        return Task(id=task_id, job=Job(**json.loads(record)), refresh=bool(refresh))
+
+    def renew(self, worker: str):
+        """Extends the leases of every job the worker is working on."""
+        self._conn.execute(
+            "UPDATE tasks SET lease_expires = ? WHERE state = ? AND worker = ?",
+            (time.time() + self.lease_seconds, TASK_LEASED, worker),
+        )
+
+    def complete(self, task_id: int, worker: str, job: Job) -> bool:
+        """
+        Stores a scraped job. Returns False if the worker had lost its lease
+        (the job was handed to another worker), in which case it is ignored.
+        """
+        return bool(
+            self._conn.execute(
+                "UPDATE tasks SET state = ?, result = ?, worker = NULL"
+                " WHERE id = ? AND state = ? AND worker = ?",
+                (TASK_DONE, _job_record(job), task_id, TASK_LEASED, worker),
+            ).rowcount
+        )
+
+    def drained(self) -> bool:
+        """True once no more jobs will be queued and none is left to scrape."""
+        closed = self._conn.execute(
+            "SELECT 1 FROM meta WHERE key = 'input_closed'"
+        ).fetchone()
+        if not closed:
+            return False
+        unfinished = self._conn.execute(
+            "SELECT 1 FROM tasks WHERE state IN (?, ?) LIMIT 1",
+            (TASK_QUEUED, TASK_LEASED),
+        ).fetchone()
+        return unfinished is None
+
+    def close(self):
+        self._conn.close()
+
+    def remove(self):
+        """Closes the queue and deletes its files."""
+        self.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)